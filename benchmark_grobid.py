@@ -0,0 +1,137 @@
+"""Throughput benchmark for the GROBID ingestion stage.
+
+Measures docs/sec and peak RSS of ``GrobidClient.process_pdf`` (against the
+offline stand-in in ``grobid_standin.py``) and of ``extract_info`` for several
+concurrency levels and corpus sizes. Every scenario runs in a fresh process so
+that peak RSS belongs to that scenario alone. Larger corpora are made by
+repeating the PDFs in ``pdfs/``.
+
+    python benchmark_grobid.py --workers 1 4 8 --sizes 23 230 --latency 0.2
+"""
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from multiprocessing import get_context
+
+from grobid import PDF_DIR, GrobidClient, extract_info
+from grobid_standin import load_responses
+
+
+def peak_rss_mb():
+    """Peak resident set size of the current process in MB (None if unavailable)."""
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    return peak / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+
+def corpus_pdfs(size, pdf_dir=PDF_DIR):
+    pdfs = sorted(os.path.join(pdf_dir, pdf) for pdf in os.listdir(pdf_dir) if pdf.endswith(".pdf"))
+    return [pdfs[i % len(pdfs)] for i in range(size)]
+
+
+def run_process_pdf(api_url, workers, size):
+    pdf_paths = corpus_pdfs(size)
+    with tempfile.TemporaryDirectory() as cache_dir:
+        client = GrobidClient(api_url=api_url, cache_dir=cache_dir, use_cache=False)
+        client.version  # discovery is not part of the measurement
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            ok = sum(1 for tei_xml in executor.map(client.process_pdf, pdf_paths) if tei_xml)
+        elapsed = time.perf_counter() - start
+    return {"ok": ok, "seconds": elapsed, "peak_rss_mb": peak_rss_mb()}
+
+
+def run_extract_info(workers, size):
+    documents = list(load_responses().values())
+    corpus = [documents[i % len(documents)] for i in range(size)]
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        ok = sum(1 for _ in executor.map(extract_info, corpus, map(str, range(size))))
+    elapsed = time.perf_counter() - start
+    return {"ok": ok, "seconds": elapsed, "peak_rss_mb": peak_rss_mb()}
+
+
+def in_fresh_process(fn, *args):
+    with ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn")) as executor:
+        return executor.submit(fn, *args).result()
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_standin(latency, error_rate, max_concurrency):
+    """Runs grobid_standin.py in its own process; returns ``(process, api_url)``."""
+    port = free_port()
+    cmd = [
+        sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), "grobid_standin.py"),
+        "--port", str(port),
+        "--latency", str(latency), "--error-rate", str(error_rate),
+    ]
+    if max_concurrency:
+        cmd += ["--max-concurrency", str(max_concurrency)]
+    process = subprocess.Popen(cmd, stdout=subprocess.DEVNULL)
+    api_url = f"http://127.0.0.1:{port}/api"
+    for _ in range(100):
+        try:
+            urllib.request.urlopen(f"{api_url}/isalive", timeout=1)
+            return process, api_url
+        except OSError:
+            time.sleep(0.1)
+    process.terminate()
+    raise ConnectionError("The GROBID stand-in did not start")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark GROBID ingestion offline.")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4, 8])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[23, 230])
+    parser.add_argument("--latency", type=float, default=0.2, help="stand-in mean seconds per PDF")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="stand-in fraction of 503s")
+    parser.add_argument("--max-concurrency", type=int, default=None, help="stand-in pool size")
+    parser.add_argument("--json", default=None, help="also write the results to this file")
+    args = parser.parse_args(argv)
+
+    results = []
+    process, api_url = start_standin(args.latency, args.error_rate, args.max_concurrency)
+    try:
+        for stage in ("process_pdf", "extract_info"):
+            for size in args.sizes:
+                for workers in args.workers:
+                    if stage == "process_pdf":
+                        result = in_fresh_process(run_process_pdf, api_url, workers, size)
+                    else:
+                        result = in_fresh_process(run_extract_info, workers, size)
+                    result.update(stage=stage, size=size, workers=workers)
+                    result["docs_per_sec"] = result["ok"] / result["seconds"]
+                    results.append(result)
+                    rss = result["peak_rss_mb"]
+                    print(
+                        f"{stage:<13} size={size:<6} workers={workers:<3} "
+                        f"{result['docs_per_sec']:9.1f} docs/s  "
+                        f"peak RSS {'n/a' if rss is None else f'{rss:.1f} MB':>9}  "
+                        f"({result['ok']}/{size} ok)"
+                    )
+    finally:
+        process.terminate()
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
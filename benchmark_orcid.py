@@ -0,0 +1,127 @@
+"""Throughput benchmark for the ORCID author-enrichment stage.
+
+Runs ``person.enrich_authors`` (``enrich_author_info`` per distinct author, or
+its asyncio variant) against the offline stand-in in ``orcid_standin.py`` for
+several concurrency levels and reports authors/sec and ORCID requests per
+author. Both rates are per distinct author (one lookup each); the number of
+author occurrences in the corpus is reported separately. The author cache is
+not used, so every distinct author is looked up. Every scenario runs in a
+fresh process with a fresh client.
+
+    python benchmark_orcid.py --concurrency 1 8 16 --latency 0.3 --rate 24
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+import urllib.request
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+from benchmark_grobid import free_port, peak_rss_mb
+
+
+def run_enrichment(api_url, concurrency, client_rate=None):
+    os.environ["ORCID_API_URL"] = api_url
+    os.environ["ORCID_ACCESS_TOKEN"] = "standin"
+    import builtins
+
+    import person
+
+    if client_rate:
+        person.ORCID_RATE = client_rate
+    with open(person.INPUT_PATH, "r", encoding="utf-8") as f:
+        papers = json.load(f)
+
+    print_ = builtins.print
+    builtins.print = lambda *args, **kwargs: None  # person.py logs every lookup
+    try:
+        start = time.perf_counter()
+        enriched = person.enrich_authors(papers, cache=None, concurrency=concurrency)
+        elapsed = time.perf_counter() - start
+    finally:
+        builtins.print = print_
+    # enrich_authors returns one record per occurrence, in corpus order
+    found = {}
+    occurrences = (
+        (author.get("name"), author.get("affiliation", ""))
+        for paper in papers for author in paper.get("authors", [])
+    )
+    for (name, affiliation), record in zip(occurrences, enriched):
+        key = person.author_key(name, " ".join(affiliation.split()) if affiliation else None)
+        found[key] = bool(record["orcid_id"])
+    return {
+        "occurrences": len(enriched),
+        "authors": len(found),
+        "found": sum(found.values()),
+        "requests": person.orcid_client.requests,
+        "seconds": elapsed,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def in_fresh_process(fn, *args):
+    with ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn")) as executor:
+        return executor.submit(fn, *args).result()
+
+
+def start_standin(latency, error_rate, rate, decoys):
+    """Runs orcid_standin.py in its own process; returns ``(process, api_url)``."""
+    port = free_port()
+    cmd = [
+        sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), "orcid_standin.py"),
+        "--port", str(port),
+        "--latency", str(latency), "--error-rate", str(error_rate), "--decoys", str(decoys),
+    ]
+    if rate:
+        cmd += ["--rate", str(rate)]
+    process = subprocess.Popen(cmd, stdout=subprocess.DEVNULL)
+    api_url = f"http://127.0.0.1:{port}/v3.0"
+    for _ in range(100):
+        try:
+            urllib.request.urlopen(f"{api_url}/search?q=", timeout=1)
+            return process, api_url
+        except OSError:
+            time.sleep(0.1)
+    process.terminate()
+    raise ConnectionError("The ORCID stand-in did not start")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark ORCID author enrichment offline.")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 16])
+    parser.add_argument("--latency", type=float, default=0.3, help="stand-in mean seconds per request")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="stand-in fraction of random 429s")
+    parser.add_argument("--rate", type=float, default=None, help="stand-in requests/second before 429")
+    parser.add_argument("--client-rate", type=float, default=None, help="override person.ORCID_RATE")
+    parser.add_argument("--decoys", type=int, default=2, help="homonym profiles per author name")
+    parser.add_argument("--json", default=None, help="also write the results to this file")
+    args = parser.parse_args(argv)
+
+    results = []
+    process, api_url = start_standin(args.latency, args.error_rate, args.rate, args.decoys)
+    try:
+        for concurrency in args.concurrency:
+            result = in_fresh_process(run_enrichment, api_url, concurrency, args.client_rate)
+            result.update(concurrency=concurrency)
+            result["authors_per_sec"] = result["authors"] / result["seconds"]
+            result["requests_per_author"] = result["requests"] / max(result["authors"], 1)
+            results.append(result)
+            print(
+                f"concurrency={concurrency:<3} {result['authors_per_sec']:8.1f} authors/s  "
+                f"{result['requests_per_author']:5.2f} requests/author  "
+                f"({result['found']}/{result['authors']} distinct authors found, "
+                f"{result['occurrences']} occurrences, {result['seconds']:.1f}s)"
+            )
+    finally:
+        process.terminate()
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+# -*- coding: utf-8 -*-
+"""Gazetteer de financiadores / organizaciones / proyectos (Aho‑Corasick).
+
+Los agradecimientos repiten una y otra vez los mismos pocos cientos de
+entidades (agencias nacionales, programas marco de la UE, universidades…).
+`ner.py` busca primero estas entidades ya confirmadas con un autómata
+Aho‑Corasick (tiempo lineal en el texto) y solo manda al modelo los trozos
+que quedan.
+
+• Se construye desde `outputs/ner_gazetteer.json` (entidades confirmadas en
+  ejecuciones anteriores) y, opcionalmente, una lista semilla con el mismo
+  formato (`{"organizations": [...], "projects": [...]}`).
+• Crece solo: cada etiqueta que Wikidata confirma como org / proyecto se
+  añade y el autómata se recompila la siguiente vez que se usa.
+• La comparación no distingue mayúsculas y exige límites de palabra.
+• Una coincidencia que forma parte de un nombre más largo no cuenta: con
+  "Wuhan University" en el gazetteer, "Wuhan University of Technology" va
+  entero al modelo en lugar de registrarse como otra institución.
+"""
+from __future__ import annotations
+
+import json
+import os
+import re
+from collections import deque
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+ROOT            = Path(__file__).resolve().parent
+GAZETTEER_FILE  = ROOT / "outputs/ner_gazetteer.json"
+KINDS           = {"org": "organizations", "proj": "projects"}
+MIN_LENGTH      = 3
+# palabras que continúan un nombre propio ("University *of* Technology")
+CONNECTORS      = {"of", "for", "de", "del", "della", "di", "des", "du", "für", "van", "von"}
+WORD_AFTER_RE   = re.compile(r"\s+(\w+)")
+WORD_BEFORE_RE  = re.compile(r"(\w+)\s+$")
+
+def normalize(text: str) -> str:
+    """*casefold* carácter a carácter, conservando la longitud (y las posiciones)."""
+    return "".join(f if len(f := c.casefold()) == 1 else c for c in text)
+
+def continues_name(text: str, start: int, end: int) -> bool:
+    """True si `text[start:end]` va seguido de un conector o una palabra en
+    mayúscula, o precedido de una palabra en mayúscula (parte de un nombre más largo)."""
+    after = WORD_AFTER_RE.match(text, end)
+    if after and (after.group(1) in CONNECTORS or after.group(1)[0].isupper()):
+        return True
+    before = WORD_BEFORE_RE.search(text, max(0, start - 100), start)
+    return bool(before and before.group(1)[0].isupper())
+
+###############################################################################
+# AUTÓMATA                                                                   #
+###############################################################################
+
+class Automaton:
+    """Aho‑Corasick sobre caracteres: `find` devuelve todas las apariciones."""
+
+    def __init__(self, patterns: Dict[str, str]):
+        # patterns: patrón normalizado → tipo ('org' / 'proj')
+        self.goto: List[Dict[str, int]] = [{}]
+        self.fail: List[int] = [0]
+        self.out: List[List[Tuple[int, str]]] = [[]]   # (longitud, tipo)
+        for pattern, kind in patterns.items():
+            node = 0
+            for ch in pattern:
+                nxt = self.goto[node].get(ch)
+                if nxt is None:
+                    nxt = len(self.goto)
+                    self.goto[node][ch] = nxt
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.out.append([])
+                node = nxt
+            self.out[node].append((len(pattern), kind))
+
+        queue = deque(self.goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, nxt in self.goto[node].items():
+                queue.append(nxt)
+                f = self.fail[node]
+                while f and ch not in self.goto[f]:
+                    f = self.fail[f]
+                self.fail[nxt] = self.goto[f].get(ch, 0)
+                self.out[nxt] = self.out[nxt] + self.out[self.fail[nxt]]
+
+    def find(self, text: str) -> List[Tuple[int, int, str]]:
+        """Apariciones `(inicio, fin, tipo)` en `text` (ya normalizado)."""
+        hits, node = [], 0
+        for i, ch in enumerate(text):
+            while node and ch not in self.goto[node]:
+                node = self.fail[node]
+            node = self.goto[node].get(ch, 0)
+            for length, kind in self.out[node]:
+                hits.append((i + 1 - length, i + 1, kind))
+        return hits
+
+###############################################################################
+# GAZETTEER                                                                  #
+###############################################################################
+
+class Gazetteer:
+    """Entidades confirmadas (etiqueta normalizada → 'org' / 'proj')."""
+
+    def __init__(self, path: Path | None = GAZETTEER_FILE):
+        self.path = Path(path) if path else None
+        self.entries: Dict[str, str] = {}
+        self._automaton: Automaton | None = None
+        self._dirty = False
+        if self.path and self.path.exists():
+            self.update(json.loads(self.path.read_text("utf-8")))
+            self._dirty = False
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def add(self, label: str, kind: str) -> None:
+        key = normalize(label.strip())
+        if kind not in KINDS or len(key) < MIN_LENGTH or self.entries.get(key) == kind:
+            return
+        self.entries[key] = kind
+        self._automaton = None
+        self._dirty = True
+
+    def update(self, data: Dict[str, List[str]]) -> None:
+        """Añade entidades con el formato `{"organizations": [...], "projects": [...]}`."""
+        for kind, field in KINDS.items():
+            for label in data.get(field, []):
+                self.add(label, kind)
+
+    def load_seed(self, path: str | Path) -> None:
+        self.update(json.loads(Path(path).read_text("utf-8")))
+
+    def find(self, text: str) -> List[Tuple[int, int, str]]:
+        """Apariciones `(inicio, fin, tipo)` sin solaparse, la más larga primero.
+
+        Solo cuentan las que empiezan y terminan en límite de palabra y no
+        forman parte de un nombre más largo (`continues_name`).
+        """
+        if not self.entries:
+            return []
+        if self._automaton is None:
+            self._automaton = Automaton(self.entries)
+        hits = [
+            (s, e, k) for s, e, k in self._automaton.find(normalize(text))
+            if (s == 0 or not text[s - 1].isalnum()) and (e == len(text) or not text[e].isalnum())
+            and not continues_name(text, s, e)
+        ]
+        hits.sort(key=lambda h: (h[0], h[0] - h[1]))
+        out, end = [], 0
+        for s, e, k in hits:
+            if s >= end:
+                out.append((s, e, k))
+                end = e
+        return out
+
+    def split(self, text: str) -> Tuple[List[Tuple[str, str]], List[str]]:
+        """`(coincidencias, resto)`: `(texto, tipo)` de cada coincidencia y los
+        trozos de `text` que quedan entre ellas (los que mandar al modelo)."""
+        found, rest, pos = [], [], 0
+        for s, e, k in self.find(text):
+            found.append((text[s:e], k))
+            rest.append(text[pos:s])
+            pos = e
+        rest.append(text[pos:])
+        return found, [r for r in rest if any(c.isalpha() for c in r)]
+
+    def save(self) -> None:
+        """Guarda el gazetteer (solo si ha cambiado), de forma atómica."""
+        if not self._dirty or self.path is None:
+            return
+        data = {field: sorted(k for k, v in self.entries.items() if v == kind)
+                for kind, field in KINDS.items()}
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(data, indent=2, ensure_ascii=False), "utf-8")
+        os.replace(tmp, self.path)
+        self._dirty = False
@@ -1,17 +1,73 @@
+"""GROBID ingestion: PDF -> TEI XML -> paper metadata.
+
+Importing this module has no side effects; the GROBID server is only looked
+up the first time a :class:`GrobidClient` needs it, so ``extract_info`` can be
+reused (and benchmarked) without a running GROBID.
+
+    client = GrobidClient()
+    for filename, info, latency in client.iter_directory("pdfs/"):
+        ...
+
+Run ``python grobid.py`` to process ``pdfs/`` into ``outputs/papers_metadata.json``.
+"""
+import argparse
+import hashlib
+import json
 import os
-import requests
+import random
+import re
+import threading
+import time
+import unicodedata
 import xml.etree.ElementTree as ET
-import json
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+# GROBID Server URLs, tried in order (Docker service name first)
+GROBID_CANDIDATE_URLS = ["http://grobid:8070/api", "http://localhost:8070/api"]
+GROBID_ENDPOINT = "processFulltextDocument"
+
+# Extra form fields sent with every PDF (part of the TEI cache key). No
+# teiCoordinates: nothing downstream reads them and they slow GROBID down.
+GROBID_PARAMS = {}
+
+# Ingestion profiles: the GROBID endpoints called for each PDF. Only the full
+# text contains the acknowledgements; the lighter endpoints are much cheaper.
+PROFILES = {
+    "full": ["processFulltextDocument"],
+    "header": ["processHeaderDocument"],
+    "references": ["processReferences"],
+    "header+references": ["processHeaderDocument", "processReferences"],
+}
+DEFAULT_PROFILE = "full"
+
+# Fields of the extract_info output that each endpoint provides
+ENDPOINT_FIELDS = {
+    "processFulltextDocument": (
+        "title", "authors", "abstract", "publication_date", "acknowledgements", "references",
+    ),
+    "processHeaderDocument": ("title", "authors", "abstract", "publication_date"),
+    "processReferences": ("references",),
+}
+
+# Directories
+PDF_DIR = "pdfs/"
+OUTPUT_DIR = "outputs/"
+TEI_CACHE_DIR = os.path.join(OUTPUT_DIR, "tei_cache")
+REFERENCE_INDEX_PATH = os.path.join(OUTPUT_DIR, "references_index.json")
 
-# GROBID Server URLs
-GROBID_DOCKER_URL = "http://grobid:8070/api/isalive"
-GROBID_LOCAL_URL = "http://localhost:8070/api/isalive"
+# Ingestion settings
+DEFAULT_WORKERS = 4  # in-flight requests; match the GROBID container's cores
+MAX_RETRIES = 5  # retries when GROBID answers 503 (all its threads are busy)
+BACKOFF_BASE = 1.0  # seconds, doubled after every 503
+REQUEST_TIMEOUT = 300  # seconds
 
 
-def check_grobid_status(url):
+def check_grobid_status(api_url):
     """Checks if the GROBID service is active."""
+    import requests
+
     try:
-        response = requests.get(url, timeout=5)
+        response = requests.get(f"{api_url}/isalive", timeout=5)
         if response.status_code == 200:
             return True
     except requests.exceptions.RequestException:
@@ -19,157 +75,562 @@ def check_grobid_status(url):
     return False
 
 
-# Automatically select the GROBID URL
-if check_grobid_status(GROBID_DOCKER_URL):
-    GROBID_URL = "http://grobid:8070/api/processFulltextDocument"
-    print(f"Using GROBID at {GROBID_URL}")
-elif check_grobid_status(GROBID_LOCAL_URL):
-    GROBID_URL = "http://localhost:8070/api/processFulltextDocument"
-    print(f"Using GROBID at {GROBID_URL}")
-else:
+def discover_grobid(candidates=GROBID_CANDIDATE_URLS):
+    """Returns the API URL of the first GROBID instance that answers."""
+    for api_url in candidates:
+        if check_grobid_status(api_url):
+            print(f"Using GROBID at {api_url}")
+            return api_url
     raise ConnectionError("No instance of GROBID (Docker or Local) is available!")
 
-# Directories
-PDF_DIR = "pdfs/"
-OUTPUT_DIR = "outputs/"
 
-# Ensure the output directory exists
-os.makedirs(OUTPUT_DIR, exist_ok=True)
+def get_grobid_version(api_url):
+    """Returns the version string reported by the GROBID server."""
+    import requests
+
+    try:
+        response = requests.get(f"{api_url}/version", timeout=5)
+        if response.status_code == 200:
+            return response.text.strip()
+    except requests.exceptions.RequestException:
+        pass
+    return "unknown"
 
 
-# Function to process PDFs with GROBID
-def process_pdf(pdf_path):
-    with open(pdf_path, "rb") as pdf_file:
-        files = {"input": pdf_file}
-        response = requests.post(
-            GROBID_URL, files=files, data={"teiCoordinates": "figure"}
-        )
-    if response.status_code == 200:
-        return response.text  # Returns TEI XML
-    else:
-        print(f"Error processing {pdf_path}: {response.status_code}")
+def load_cached_tei(cache_path):
+    if os.path.exists(cache_path):
+        with open(cache_path, "r", encoding="utf-8") as f:
+            return f.read()
+    return None
+
+
+def store_cached_tei(cache_path, tei_xml):
+    # Write to a temporary file first so an interrupted run never leaves a partial entry
+    os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+    tmp_path = f"{cache_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(tei_xml)
+    os.replace(tmp_path, cache_path)
+
+
+TEI_NS = "{http://www.tei-c.org/ns/1.0}"
+PARSE_CHUNK_SIZE = 64 * 1024  # characters fed to the pull parser at a time
+
+# Elements whose whole subtree is read once they close; their descendants are
+# kept in memory until then. Everything else is dropped as soon as it closes.
+_RETAINED_TAGS = {"abstract", "author", "div"}
+
+
+def _person_name(author, strip=True):
+    """Joins forename and surname of an author's persName (None if absent)."""
+    pers_name = author.find(TEI_NS + "persName")
+    if pers_name is None:
         return None
+    name_parts = []
+    for part in ("forename", "surname"):
+        el = pers_name.find(TEI_NS + part)
+        if el is not None and el.text:
+            name_parts.append(el.text.strip() if strip else el.text)
+    return " ".join(name_parts) if name_parts else None
 
 
-def extract_info(tei_xml, filename):
-    ns = {"tei": "http://www.tei-c.org/ns/1.0"}
-    root = ET.fromstring(tei_xml)
+def _pull_events(tei_xml):
+    """Yields ``(event, element)`` pairs while feeding the document in chunks."""
+    parser = ET.XMLPullParser(events=("start", "end"))
+    for offset in range(0, len(tei_xml), PARSE_CHUNK_SIZE):
+        parser.feed(tei_xml[offset:offset + PARSE_CHUNK_SIZE])
+        yield from parser.read_events()
+    parser.close()
 
-    # Title
-    title_el = root.find(".//tei:titleStmt/tei:title", ns)
-    title = title_el.text.strip() if title_el is not None else ""
 
-    # Authors with affiliations
+def extract_info(tei_xml, filename, header_only=False):
+    """Extracts the paper metadata from a GROBID TEI document in a single pass.
+
+    The document is read with a pull parser: every field is picked up as its
+    element closes and finished subtrees are released, so large documents
+    (theses, reviews with hundreds of references) are never held whole in memory.
+    With ``header_only`` parsing stops at the end of the ``teiHeader`` (title,
+    authors, abstract and date), which is all ``processHeaderDocument`` returns.
+    """
+    title = None
+    date = None
+    abstract = None
     authors = []
-    tei_header = root.find("tei:teiHeader", ns)
-    if tei_header is not None:
-        for author in tei_header.findall(".//tei:author", ns):
-            author_data = {}
-            pers_name = author.find("tei:persName", ns)
-            
-            # Initialize name-related data
-            name_parts = []
-            if pers_name is not None:
-                forename = pers_name.find("tei:forename", ns)
-                surname = pers_name.find("tei:surname", ns)
-                if forename is not None and forename.text:
-                    name_parts.append(forename.text.strip())
-                if surname is not None and surname.text:
-                    name_parts.append(surname.text.strip())
-            
-            # Only proceed if a valid name is found
-            if name_parts:
-                author_data["name"] = " ".join(name_parts)
-    
-                # Affiliation (optional)
-                aff = author.find("tei:affiliation", ns)
-                if aff is not None:
-                    raw_affiliation = " ".join(aff.itertext())
-                    # Clean up whitespace
-                    affiliation_text = " ".join(raw_affiliation.split())
-                    author_data["affiliation"] = affiliation_text
-                else:
-                    author_data["affiliation"] = None
-    
-                authors.append(author_data)
-
-    # Abstract
-    abstract_el = root.find(".//tei:abstract", ns)
-    abstract = (
-        " ".join(abstract_el.itertext()).strip() if abstract_el is not None else ""
-    )
+    ack_text = ""
+    ack_order = None  # document position of the acknowledgement div found so far
+    references = []
+    bibl = None  # reference being collected (a listBibl/biblStruct)
 
-    # Date of publication
-    date_el = root.find(".//tei:publicationStmt/tei:date", ns)
-    date = date_el.text.strip() if date_el is not None else ""
+    stack = []  # open elements, root first
+    div_order = {}  # open div -> position in document order
+    div_count = 0
+    retained = 0  # number of open elements in _RETAINED_TAGS
+    in_header = False
 
-    # Acknowledgement
-    ack_text = ""
-    for div in root.findall(".//tei:div", ns):
-        head = div.find("tei:head", ns)
-        if head is not None and "acknowledg" in head.text.lower():
-            ack_text = " ".join(div.itertext()).strip()
-            break
+    for event, el in _pull_events(tei_xml):
+        # GROBID output lives entirely in the TEI namespace: compare local names
+        tag = el.tag[len(TEI_NS):] if el.tag.startswith(TEI_NS) else el.tag
+        if event == "start":
+            parent_tag = stack[-1][1] if stack else None
+            stack.append((el, tag))
+            if tag in _RETAINED_TAGS:
+                retained += 1
+            if tag == "teiHeader":
+                in_header = True
+            elif tag == "div":
+                div_order[el] = div_count
+                div_count += 1
+            elif tag == "biblStruct" and parent_tag == "listBibl" and bibl is None:
+                bibl = {"element": el, "authors": []}
+            continue
 
-    # References
-    references = []
-    for bibl in root.findall(".//tei:listBibl/tei:biblStruct", ns):
-        # Reference authors
-        ref_authors = []
-        for author in bibl.findall(".//tei:author", ns):
-            pers_name = author.find("tei:persName", ns)
-            if pers_name is not None:
-                forename = pers_name.find("tei:forename", ns)
-                surname = pers_name.find("tei:surname", ns)
-                name_parts = []
-                if forename is not None:
-                    name_parts.append(forename.text)
-                if surname is not None:
-                    name_parts.append(surname.text)
-                if name_parts:
-                    ref_authors.append(" ".join(name_parts))
-
-        # Reference title
-        title_el = bibl.find(".//tei:title", ns)
-
-        if title_el is not None and title_el.text is not None:
-            ref_title = title_el.text.strip()
-        else:
-            ref_title = ""
+        # event == "end": the element and its whole subtree are complete
+        stack.pop()
+        parent, parent_tag = stack[-1] if stack else (None, None)
+        if tag in _RETAINED_TAGS:
+            retained -= 1
 
-        # Reference DOI or other ID
-        doi = None
-        idno = bibl.find(".//tei:idno", ns)
-        if idno is not None:
-            doi = idno.text.strip()
+        if tag == "title":
+            if bibl is not None:
+                if "title" not in bibl:
+                    bibl["title"] = el.text.strip() if el.text is not None else ""
+            elif title is None and parent_tag == "titleStmt":
+                title = (el.text or "").strip()
+        elif tag == "author":
+            if bibl is not None:
+                name = _person_name(el, strip=False)
+                if name:
+                    bibl["authors"].append(name)
+            elif in_header:
+                name = _person_name(el)
+                # Only keep authors with a valid name
+                if name:
+                    aff = el.find(TEI_NS + "affiliation")
+                    affiliation_text = None
+                    if aff is not None:
+                        # Clean up whitespace
+                        affiliation_text = " ".join(" ".join(aff.itertext()).split())
+                    authors.append({"name": name, "affiliation": affiliation_text})
+        elif tag == "idno":
+            if bibl is not None and "identifier" not in bibl:
+                bibl["identifier"] = el.text.strip() if el.text is not None else None
+        elif tag == "abstract":
+            if abstract is None:
+                abstract = " ".join(el.itertext()).strip()
+        elif tag == "date":
+            if date is None and parent_tag == "publicationStmt":
+                date = (el.text or "").strip()
+        elif tag == "div":
+            order = div_order.pop(el)
+            head = el.find(TEI_NS + "head")
+            if (
+                (ack_order is None or order < ack_order)
+                and head is not None
+                and head.text
+                and "acknowledg" in head.text.lower()
+            ):
+                ack_text = " ".join(el.itertext()).strip()
+                ack_order = order
+        elif tag == "teiHeader":
+            in_header = False
+            if header_only:
+                break
 
-        references.append(
-            {"authors": ref_authors, "title": ref_title, "identifier": doi}
-        )
+        if bibl is not None and el is bibl["element"]:
+            references.append(
+                {
+                    "authors": bibl["authors"],
+                    "title": bibl.get("title", ""),
+                    "identifier": bibl.get("identifier"),
+                }
+            )
+            bibl = None
+            el.clear()
+            parent.remove(el)
+        elif retained == 0 and parent is not None:
+            # Nothing still open needs this subtree any more
+            el.clear()
+            parent.remove(el)
 
     return {
         "filename": filename,
-        "title": title,
+        "title": title or "",
         "authors": authors,
-        "abstract": abstract,
-        "publication_date": date,
+        "abstract": abstract or "",
+        "publication_date": date or "",
         "acknowledgements": ack_text,
         "references": references,
     }
 
 
-# Process all PDFs
-results = []
-for pdf in os.listdir(PDF_DIR):
-    if pdf.endswith(".pdf"):
-        pdf_path = os.path.join(PDF_DIR, pdf)
-        print(f"Processing {pdf_path}...")
-        tei_xml = process_pdf(pdf_path)
-        if tei_xml:
-            info = extract_info(tei_xml, pdf)
-            results.append(info)
+# Reference index: the same cited work gets the same canonical ID in every paper
+DOI_RE = re.compile(r"10\.\d{4,9}/\S+")
+
+
+def _normalize_text(text):
+    """Lowercases, strips accents and punctuation and collapses whitespace."""
+    text = unicodedata.normalize("NFKD", text or "")
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return " ".join(re.findall(r"\w+", text.casefold()))
+
+
+def reference_key(ref):
+    """Returns the deduplication key of a reference (None if it cannot be keyed).
+
+    The DOI when there is one, otherwise the normalized title plus the surname
+    of the first author.
+    """
+    doi = DOI_RE.search(ref.get("identifier") or "")
+    if doi:
+        return "doi:" + doi.group(0).rstrip(".,;").casefold()
+    title = _normalize_text(ref.get("title"))
+    if not title:
+        return None
+    authors = ref.get("authors") or []
+    first_author = _normalize_text(authors[0]).split() if authors else []
+    return f"title:{title}|{first_author[-1] if first_author else ''}"
+
+
+def reference_id(key):
+    """Canonical ID of a reference key (stable across runs and machines)."""
+    return "Ref_" + hashlib.sha1(key.encode("utf-8")).hexdigest()[:16]
+
+
+def assign_reference_ids(info):
+    """Adds the canonical ``ref_id`` (None if unkeyable) to every reference of a paper."""
+    for ref in info["references"]:
+        key = reference_key(ref)
+        ref["ref_id"] = reference_id(key) if key else None
+    return info
+
+
+class ReferenceIndex:
+    """Canonical cited works and the corpus papers citing them, by ``ref_id``."""
+
+    def __init__(self):
+        self.entries = {}
+
+    def add_paper(self, info):
+        for ref in info["references"]:
+            ref_id = ref.get("ref_id")
+            if not ref_id:
+                continue
+            entry = self.entries.get(ref_id)
+            if entry is None:
+                entry = self.entries[ref_id] = {
+                    "ref_id": ref_id,
+                    "title": ref["title"],
+                    "authors": ref["authors"],
+                    "identifier": ref["identifier"],
+                    "cited_by": [],
+                }
+            else:
+                # Keep the most complete version of the metadata
+                if not entry["identifier"] and ref["identifier"]:
+                    entry["identifier"] = ref["identifier"]
+                if len(ref["authors"]) > len(entry["authors"]):
+                    entry["authors"] = ref["authors"]
+            if info["filename"] not in entry["cited_by"]:
+                entry["cited_by"].append(info["filename"])
+
+    def save(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(
+                [self.entries[ref_id] for ref_id in sorted(self.entries)],
+                f,
+                indent=2,
+                ensure_ascii=False,
+            )
+
+
+class GrobidClient:
+    """Sends PDFs to a GROBID server and extracts their metadata.
+
+    The server (``api_url``, e.g. ``http://localhost:8070/api``) is discovered
+    on first use when not given. TEI responses are cached in ``cache_dir``,
+    keyed by the PDF bytes, the GROBID version and the request parameters, so
+    unchanged PDFs never reach GROBID twice (``use_cache=False`` bypasses it).
+    ``profile`` (a key of ``PROFILES``) selects the endpoints used per PDF.
+    """
+
+    def __init__(
+        self,
+        api_url=None,
+        cache_dir=TEI_CACHE_DIR,
+        use_cache=True,
+        max_retries=MAX_RETRIES,
+        timeout=REQUEST_TIMEOUT,
+        profile=DEFAULT_PROFILE,
+    ):
+        if profile not in PROFILES:
+            raise ValueError(f"Unknown profile {profile!r}, expected one of {sorted(PROFILES)}")
+        self._api_url = api_url.rstrip("/") if api_url else None
+        self._version = None
+        self._lock = threading.Lock()
+        self.cache_dir = cache_dir
+        self.use_cache = use_cache
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self.profile = profile
+
+    @property
+    def api_url(self):
+        with self._lock:
+            if self._api_url is None:
+                self._api_url = discover_grobid()
+            return self._api_url
+
+    @property
+    def version(self):
+        if self._version is None:
+            self._version = get_grobid_version(self.api_url)
+        return self._version
+
+    # TEI cache: raw GROBID output keyed by PDF content, GROBID version and parameters
+    def tei_cache_path(self, pdf_bytes, endpoint=GROBID_ENDPOINT):
+        digest = hashlib.sha256(pdf_bytes)
+        digest.update(endpoint.encode("utf-8"))
+        digest.update(self.version.encode("utf-8"))
+        digest.update(json.dumps(GROBID_PARAMS, sort_keys=True).encode("utf-8"))
+        return os.path.join(self.cache_dir, f"{digest.hexdigest()}.tei.xml")
+
+    def process_pdf(self, pdf_path, endpoint=GROBID_ENDPOINT):
+        """Returns the TEI XML of a PDF for one GROBID endpoint, from the cache or from GROBID.
+
+        GROBID is retried with exponential backoff while it answers 503.
+        """
+        import requests
+
+        with open(pdf_path, "rb") as pdf_file:
+            pdf_bytes = pdf_file.read()
+        cache_path = self.tei_cache_path(pdf_bytes, endpoint)
+        if self.use_cache:
+            tei_xml = load_cached_tei(cache_path)
+            if tei_xml is not None:
+                return tei_xml
+
+        delay = BACKOFF_BASE
+        for attempt in range(self.max_retries + 1):
+            try:
+                files = {"input": (os.path.basename(pdf_path), pdf_bytes, "application/pdf")}
+                response = requests.post(
+                    f"{self.api_url}/{endpoint}",
+                    files=files,
+                    data=GROBID_PARAMS,
+                    timeout=self.timeout,
+                )
+            except requests.exceptions.RequestException as e:
+                print(f"Error processing {pdf_path}: {e}")
+                return None
+            if response.status_code != 503 or attempt == self.max_retries:
+                break
+            # GROBID is saturated: wait (with jitter so workers don't retry in lockstep)
+            time.sleep(delay + random.uniform(0, delay))
+            delay *= 2
+        if response.status_code == 200:
+            store_cached_tei(cache_path, response.text)
+            return response.text  # Returns TEI XML
+        else:
+            print(f"Error processing {pdf_path}: {response.status_code}")
+            return None
+
+    extract_info = staticmethod(extract_info)
+
+    def process_file(self, pdf_path):
+        """Runs one PDF through GROBID and the TEI extractor, timing the whole trip.
+
+        Returns ``(filename, info, latency)``; ``info`` is None if GROBID failed.
+        """
+        filename = os.path.basename(pdf_path)
+        start = time.perf_counter()
+        info = None
+        for endpoint in PROFILES[self.profile]:
+            tei_xml = self.process_pdf(pdf_path, endpoint)
+            if not tei_xml:
+                return filename, None, time.perf_counter() - start
+            extracted = extract_info(
+                tei_xml, filename, header_only=endpoint == "processHeaderDocument"
+            )
+            if info is None:
+                # Fields the profile does not cover keep extract_info's empty values
+                info = {
+                    field: [] if isinstance(value, list) else ""
+                    for field, value in extracted.items()
+                }
+                info["filename"] = filename
+            for field in ENDPOINT_FIELDS[endpoint]:
+                info[field] = extracted[field]
+        assign_reference_ids(info)
+        return filename, info, time.perf_counter() - start
+
+    def iter_directory(self, pdf_dir=PDF_DIR, workers=DEFAULT_WORKERS, skip=()):
+        """Yields ``(filename, info, latency)`` for every PDF in ``pdf_dir``.
+
+        Up to ``workers`` PDFs are sent to GROBID concurrently; results come in
+        completion order. Filenames in ``skip`` are not processed.
+        """
+        pdfs = sorted(
+            pdf for pdf in os.listdir(pdf_dir) if pdf.endswith(".pdf") and pdf not in skip
+        )
+        workers = max(1, workers)
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            # Keep a bounded window of submitted files so finished results are not retained
+            queue = iter(pdfs)
+            in_flight = set()
+            while True:
+                for pdf in queue:
+                    in_flight.add(executor.submit(self.process_file, os.path.join(pdf_dir, pdf)))
+                    if len(in_flight) >= 2 * workers:
+                        break
+                if not in_flight:
+                    break
+                finished, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    yield future.result()
+
+
+def load_checkpoint(jsonl_path, profile=DEFAULT_PROFILE):
+    """Returns the filenames already stored in the JSONL checkpoint by ``profile``.
+
+    Only the last record of each paper counts. Papers stored by another profile
+    are processed again (the new record wins in ``jsonl_to_json``); records
+    from before profiles were stored come from the full text. A truncated last line (the process died while writing it)
+    is cut off, so that paper is simply processed again.
+    """
+    profiles = {}
+    if not os.path.exists(jsonl_path):
+        return set()
+    with open(jsonl_path, "rb+") as f:
+        end_of_last_line = 0
+        for line in iter(f.readline, b""):
+            if not line.endswith(b"\n"):
+                f.truncate(end_of_last_line)
+                break
+            end_of_last_line = f.tell()
+            try:
+                record = json.loads(line)
+                profiles[record["filename"]] = record.get("profile", DEFAULT_PROFILE)
+            except (ValueError, KeyError):
+                continue
+    return {filename for filename, stored in profiles.items() if stored == profile}
+
+
+def append_record(jsonl_file, info):
+    """Appends one paper to the JSONL checkpoint and makes sure it reaches disk."""
+    jsonl_file.write(json.dumps(info, ensure_ascii=False) + "\n")
+    jsonl_file.flush()
+    os.fsync(jsonl_file.fileno())
+
+
+def jsonl_to_json(jsonl_path, json_path, reference_index=None):
+    """Writes the JSONL records as the indented JSON array used downstream.
+
+    Only line offsets are kept in memory: records are sorted by filename (the
+    last record wins if a file appears twice) and copied one at a time. Each
+    record is also added to ``reference_index`` when given.
+    """
+    offsets = {}
+    with open(jsonl_path, "rb") as f:
+        offset = f.tell()
+        for line in iter(f.readline, b""):
+            try:
+                offsets[json.loads(line)["filename"]] = offset
+            except (ValueError, KeyError):
+                pass
+            offset = f.tell()
+
+        with open(json_path, "w", encoding="utf-8") as out:
+            out.write("[")
+            for i, filename in enumerate(sorted(offsets)):
+                f.seek(offsets[filename])
+                record = json.loads(f.readline())
+                record.pop("profile", None)  # checkpoint bookkeeping only
+                if reference_index is not None:
+                    # Records from before the reference index existed have no ref_id
+                    if any("ref_id" not in ref for ref in record["references"]):
+                        assign_reference_ids(record)
+                    reference_index.add_paper(record)
+                text = json.dumps(record, indent=2, ensure_ascii=False)
+                out.write(("," if i else "") + "\n  " + text.replace("\n", "\n  "))
+            out.write("\n]" if offsets else "]")
+    return len(offsets)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Extract paper metadata with GROBID.")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=int(os.environ.get("GROBID_WORKERS", DEFAULT_WORKERS)),
+        help="number of PDFs sent to GROBID concurrently (1 = sequential)",
+    )
+    parser.add_argument(
+        "--grobid-url",
+        default=os.environ.get("GROBID_URL"),
+        help="GROBID API URL, e.g. http://localhost:8070/api (default: autodetect)",
+    )
+    parser.add_argument(
+        "--profile",
+        choices=sorted(PROFILES),
+        default=DEFAULT_PROFILE,
+        help="GROBID endpoints to call: 'full' is needed for acknowledgements, "
+        "'header+references' is much faster when they are not",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help=f"ignore the TEI cache in {TEI_CACHE_DIR} and resend every PDF to GROBID",
+    )
+    parser.add_argument(
+        "--fresh",
+        action="store_true",
+        help="discard the JSONL checkpoint instead of resuming from it",
+    )
+    args = parser.parse_args(argv)
+
+    jsonl_path = os.path.join(OUTPUT_DIR, "papers_metadata.jsonl")
+    json_path = os.path.join(OUTPUT_DIR, "papers_metadata.json")
+
+    # Ensure the output directory exists
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+    if args.fresh and os.path.exists(jsonl_path):
+        os.remove(jsonl_path)
+    done = load_checkpoint(jsonl_path, args.profile)
+
+    client = GrobidClient(
+        api_url=args.grobid_url, use_cache=not args.no_cache, profile=args.profile
+    )
+    # Fail fast (before spawning workers) if no GROBID is reachable
+    print(
+        f"Processing PDFs with {args.workers} worker(s), profile '{args.profile}' "
+        f"(GROBID {client.version})..."
+    )
+    if done:
+        print(f"Skipping {len(done)} PDFs already in {jsonl_path} (profile '{args.profile}')")
+
+    # Process all PDFs not yet in the checkpoint
+    processed = failed = 0
+    total_start = time.perf_counter()
+    with open(jsonl_path, "a", encoding="utf-8") as jsonl_file:
+        for pdf, info, latency in client.iter_directory(PDF_DIR, args.workers, skip=done):
+            status = "ok" if info else "failed"
+            print(f"Processed {pdf} in {latency:.2f}s ({status})")
+            if info:
+                info["profile"] = args.profile
+                append_record(jsonl_file, info)
+                processed += 1
+            else:
+                failed += 1
+    elapsed = time.perf_counter() - total_start
+    print(f"Processed {processed}/{processed + failed} PDFs in {elapsed:.2f}s")
+
+    # Save as JSON (array sorted by filename, for the downstream scripts)
+    reference_index = ReferenceIndex()
+    count = jsonl_to_json(jsonl_path, json_path, reference_index)
+    print(f"Saved {count} papers to {json_path}")
+    reference_index.save(REFERENCE_INDEX_PATH)
+    print(f"Saved {len(reference_index.entries)} unique references to {REFERENCE_INDEX_PATH}")
 
 
-# Save as JSON
-with open(os.path.join(OUTPUT_DIR, "papers_metadata.json"), "w", encoding="utf-8") as f:
-    json.dump(results, f, indent=2, ensure_ascii=False)
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,271 @@
+"""Offline stand-in for the GROBID HTTP API.
+
+Serves ``/api/isalive``, ``/api/version`` and the ``processFulltextDocument``,
+``processHeaderDocument`` and ``processReferences`` endpoints so that ``grobid.py`` can be run, profiled and benchmarked without a GROBID
+container. The TEI returned for an uploaded PDF is looked up by the SHA-256 of
+its bytes among the PDFs in ``pdfs/`` and comes from, in order:
+
+1. a recorded response ``<tei-dir>/<pdf stem>.tei.xml`` (see ``--record``),
+2. a TEI document synthesized from ``outputs/papers_metadata.json``.
+
+Every endpoint answers with the full document (the client only reads the part
+it asked for). Unknown PDFs get a 500, like GROBID does for unparseable input.
+
+    python grobid_standin.py --port 8070 --latency 0.5 --error-rate 0.05
+    python grobid_standin.py --record --grobid-url http://localhost:8070/api
+"""
+import argparse
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+import xml.etree.ElementTree as ET
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+PDF_DIR = "pdfs/"
+METADATA_PATH = "outputs/papers_metadata.json"
+TEI_FIXTURES_DIR = "outputs/tei_fixtures/"
+STANDIN_VERSION = "0.8.1-standin"
+ENDPOINTS = ("processFulltextDocument", "processHeaderDocument", "processReferences")
+
+TEI_NAMESPACE = "http://www.tei-c.org/ns/1.0"
+TEI_NS = "{" + TEI_NAMESPACE + "}"
+
+
+def metadata_to_tei(paper):
+    """Builds a GROBID-like TEI document that ``extract_info`` maps back to ``paper``."""
+
+    def sub(parent, tag, text=None, **attrib):
+        el = ET.SubElement(parent, TEI_NS + tag, attrib)
+        el.text = text
+        return el
+
+    def add_author(parent, name):
+        author = sub(parent, "author")
+        pers = sub(author, "persName")
+        forename, _, surname = (name or "").partition(" ")
+        sub(pers, "forename", forename, type="first")
+        if surname:
+            sub(pers, "surname", surname)
+        return author
+
+    tei = ET.Element(TEI_NS + "TEI")
+    header = sub(tei, "teiHeader")
+    file_desc = sub(header, "fileDesc")
+    sub(sub(file_desc, "titleStmt"), "title", paper.get("title", ""), level="a", type="main")
+    sub(sub(file_desc, "publicationStmt"), "date", paper.get("publication_date", ""), type="published")
+    analytic = sub(sub(sub(file_desc, "sourceDesc"), "biblStruct"), "analytic")
+    for author in paper.get("authors", []):
+        author_el = add_author(analytic, author["name"])
+        if author.get("affiliation"):
+            sub(sub(author_el, "affiliation"), "orgName", author["affiliation"], type="institution")
+    if paper.get("abstract"):
+        sub(sub(sub(sub(header, "profileDesc"), "abstract"), "div"), "p", paper["abstract"])
+
+    text = sub(tei, "text")
+    sub(text, "body")
+    back = sub(text, "back")
+    ack = paper.get("acknowledgements", "")
+    if ack:
+        head, _, rest = ack.partition(" ")
+        if "acknowledg" not in head.lower():
+            head, rest = "Acknowledgements", ack
+        div = sub(sub(back, "div", type="acknowledgement"), "div")
+        sub(div, "head", head)
+        sub(div, "p", rest)
+    list_bibl = sub(sub(back, "div", type="references"), "listBibl")
+    for ref in paper.get("references", []):
+        analytic = sub(sub(list_bibl, "biblStruct"), "analytic")
+        sub(analytic, "title", ref.get("title", ""), level="a", type="main")
+        for name in ref.get("authors", []):
+            add_author(analytic, name)
+        if ref.get("identifier"):
+            sub(analytic, "idno", ref["identifier"], type="DOI")
+
+    ET.register_namespace("", TEI_NAMESPACE)
+    return '<?xml version="1.0" encoding="UTF-8"?>\n' + ET.tostring(tei, encoding="unicode")
+
+
+def load_responses(pdf_dir=PDF_DIR, tei_dir=TEI_FIXTURES_DIR, metadata_path=METADATA_PATH):
+    """Maps the SHA-256 of every PDF in ``pdf_dir`` to the TEI served for it."""
+    papers = {}
+    if os.path.exists(metadata_path):
+        with open(metadata_path, "r", encoding="utf-8") as f:
+            papers = {paper["filename"]: paper for paper in json.load(f)}
+
+    responses = {}
+    for pdf in sorted(os.listdir(pdf_dir)):
+        if not pdf.endswith(".pdf"):
+            continue
+        with open(os.path.join(pdf_dir, pdf), "rb") as f:
+            digest = hashlib.sha256(f.read()).hexdigest()
+        recorded = os.path.join(tei_dir, os.path.splitext(pdf)[0] + ".tei.xml")
+        if os.path.exists(recorded):
+            with open(recorded, "r", encoding="utf-8") as f:
+                responses[digest] = f.read()
+        elif pdf in papers:
+            responses[digest] = metadata_to_tei(papers[pdf])
+    return responses
+
+
+def record_responses(grobid_url, pdf_dir=PDF_DIR, tei_dir=TEI_FIXTURES_DIR):
+    """Saves the TEI returned by a real GROBID for every PDF as a fixture."""
+    from grobid import GrobidClient
+
+    os.makedirs(tei_dir, exist_ok=True)
+    client = GrobidClient(api_url=grobid_url, use_cache=False)
+    for pdf in sorted(os.listdir(pdf_dir)):
+        if not pdf.endswith(".pdf"):
+            continue
+        tei_xml = client.process_pdf(os.path.join(pdf_dir, pdf))
+        if tei_xml:
+            path = os.path.join(tei_dir, os.path.splitext(pdf)[0] + ".tei.xml")
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(tei_xml)
+            print(f"Recorded {path}")
+
+
+class StandinServer(ThreadingHTTPServer):
+    """HTTP server replaying TEI responses with artificial latency and errors.
+
+    ``latency`` (seconds) is the mean of an exponential delay per document,
+    ``error_rate`` the fraction of requests answered with 503, and
+    ``max_concurrency`` the size of the simulated GROBID thread pool: requests
+    beyond it get a 503 straight away, as GROBID does when it is saturated.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, address, responses, latency=0.0, error_rate=0.0, max_concurrency=None, seed=None):
+        super().__init__(address, StandinHandler)
+        self.responses = responses
+        self.latency = latency
+        self.error_rate = error_rate
+        self.max_concurrency = max_concurrency
+        self.random = random.Random(seed)
+        self.in_flight = 0
+        self.lock = threading.Lock()
+        self.stats = {"requests": 0, "ok": 0, "busy": 0, "errors": 0}
+
+    def acquire(self):
+        with self.lock:
+            self.stats["requests"] += 1
+            if self.max_concurrency and self.in_flight >= self.max_concurrency:
+                self.stats["busy"] += 1
+                return False
+            if self.random.random() < self.error_rate:
+                self.stats["busy"] += 1
+                return False
+            self.in_flight += 1
+            return True
+
+    def release(self):
+        with self.lock:
+            self.in_flight -= 1
+
+
+class StandinHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def reply(self, status, body="", content_type="text/plain"):
+        data = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        if self.path.endswith("/api/isalive"):
+            self.reply(200, "true")
+        elif self.path.endswith("/api/version"):
+            self.reply(200, STANDIN_VERSION)
+        else:
+            self.reply(404, "Not found")
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        body = self.rfile.read(length)
+        if self.path.rsplit("/", 1)[-1] not in ENDPOINTS:
+            self.reply(404, "Not found")
+            return
+        if not self.server.acquire():
+            self.reply(503, "Service Unavailable")
+            return
+        try:
+            tei_xml = self.server.responses.get(hashlib.sha256(read_pdf(self.headers, body)).hexdigest())
+            if self.server.latency:
+                time.sleep(self.server.random.expovariate(1 / self.server.latency))
+        finally:
+            self.server.release()
+        if tei_xml is None:
+            with self.server.lock:
+                self.server.stats["errors"] += 1
+            self.reply(500, "[NO_BLOCKS] PDF could not be parsed")
+            return
+        with self.server.lock:
+            self.server.stats["ok"] += 1
+        self.reply(200, tei_xml, "application/xml")
+
+
+def read_pdf(headers, body):
+    """Returns the bytes of the ``input`` field of a multipart/form-data body."""
+    content_type = headers.get("Content-Type", "")
+    boundary = content_type.partition("boundary=")[2].strip('"')
+    if not boundary:
+        return b""
+    for part in body.split(b"--" + boundary.encode("latin-1")):
+        head, _, payload = part.partition(b"\r\n\r\n")
+        if b'name="input"' in head:
+            return payload[:-2] if payload.endswith(b"\r\n") else payload
+    return b""
+
+
+def start_server(port=0, **options):
+    """Starts a stand-in server in a background thread; returns ``(server, api_url)``."""
+    server = StandinServer(("127.0.0.1", port), load_responses(), **options)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/api"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Offline stand-in for the GROBID API.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8070)
+    parser.add_argument("--latency", type=float, default=0.0, help="mean seconds per document")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of 503 responses")
+    parser.add_argument("--max-concurrency", type=int, default=None, help="simulated GROBID pool size")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--pdf-dir", default=PDF_DIR)
+    parser.add_argument("--tei-dir", default=TEI_FIXTURES_DIR)
+    parser.add_argument("--record", action="store_true", help="record fixtures from --grobid-url and exit")
+    parser.add_argument("--grobid-url", default=None, help="real GROBID API used by --record")
+    args = parser.parse_args(argv)
+
+    if args.record:
+        record_responses(args.grobid_url, args.pdf_dir, args.tei_dir)
+        return
+
+    responses = load_responses(args.pdf_dir, args.tei_dir)
+    server = StandinServer(
+        (args.host, args.port),
+        responses,
+        latency=args.latency,
+        error_rate=args.error_rate,
+        max_concurrency=args.max_concurrency,
+        seed=args.seed,
+    )
+    print(f"GROBID stand-in serving {len(responses)} documents at http://{args.host}:{args.port}/api")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print(json.dumps(server.stats))
+
+
+if __name__ == "__main__":
+    main()
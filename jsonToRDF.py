@@ -1,136 +1,264 @@
 from rdflib import Graph, Namespace, URIRef, Literal
 from rdflib.namespace import RDF, RDFS, XSD
+import argparse
+import gzip
+import hashlib
 import json
-import uuid
 import glob
 import os
+import re
+import sqlite3
+import unicodedata
 
-# Cargar datos de entrada
-with open("outputs/papers_metadata.json", "r", encoding="utf-8") as f:
-    papers = json.load(f)
+from grobid import DOI_RE, reference_id, reference_key
 
-with open("outputs/enriched_authors.json", "r", encoding="utf-8") as f:
-    enriched_authors_data = json.load(f)
+PAPERS_PATH = "outputs/papers_metadata.json"
+ENRICHED_AUTHORS_PATH = "outputs/enriched_authors.json"
+SIMILARITY_FOLDER = "outputs/similarities_semantic_by_topic/"
+TURTLE_PATH = "outputs/knowledge_graph.ttl"
+NTRIPLES_PATH = "outputs/knowledge_graph.nt"
 
-# Crear grafo y namespace
-g = Graph()
 BASE = Namespace("https://example.org/")
-g.bind("base", BASE)
+# Nodos compartidos entre papers (el resto cuelga de un único paper o de los topics)
+SHARED_PREFIXES = tuple(f"{BASE}{p}" for p in ("Person_", "Org_", "Project_", "Ref_"))
+TOPIC_PREFIXES = tuple(f"{BASE}{p}" for p in ("Topic_", "TB_"))
 
-paper_uri_map = {}
+# ------------------------
+# Entrada
+# ------------------------
+def iter_papers(path):
+    """Papers de un .json (lista) o, sin cargarlo entero, de un .jsonl (uno por línea).
+
+    El .jsonl puede ser el checkpoint de grobid.py, que solo añade líneas: como
+    en `grobid.jsonl_to_json`, de cada fichero cuenta solo su último registro
+    (se indexa la posición de cada línea y se leen después, por nombre de fichero).
+    """
+    if path.endswith(".jsonl"):
+        offsets = {}
+        with open(path, "rb") as f:
+            offset = f.tell()
+            for line in iter(f.readline, b""):
+                try:
+                    offsets[json.loads(line)["filename"]] = offset
+                except (ValueError, KeyError):
+                    pass  # línea vacía o cortada
+                offset = f.tell()
+            for filename in sorted(offsets):
+                f.seek(offsets[filename])
+                paper = json.loads(f.readline())
+                paper.pop("profile", None)  # dato interno del checkpoint
+                yield paper
+    else:
+        with open(path, "r", encoding="utf-8") as f:
+            yield from json.load(f)
+
+def build_author_index(enriched_authors_data):
+    """Índice nombre → autor (el primero de cada nombre, como la búsqueda lineal)."""
+    by_name = {}
+    for item in enriched_authors_data:
+        by_name.setdefault(item["full_name"], item)
+    return by_name
+
+authors_by_name = {}
 
 def get_enriched_author_info(author_name):
-    return next((item for item in enriched_authors_data if item["full_name"] == author_name), None)
-
-for idx, paper in enumerate(papers):
-    paper_id = f"Paper_{idx+1}"
-    paper_uri = URIRef(BASE + paper_id)
-    paper_uri_map[paper["filename"]] = paper_uri  # map título para uso en similar_to
-    g.add((paper_uri, RDF.type, BASE.Paper))
-    g.add((paper_uri, BASE.has_title, Literal(paper["title"])))
-    g.add((paper_uri, BASE.has_date, Literal(paper["publication_date"])))
-
-    for author in paper.get("authors", []):
-        person_id = f"Person_{uuid.uuid4().hex[:8]}"
-        person_uri = URIRef(BASE + person_id)
-        g.add((person_uri, RDF.type, BASE.Person))
-        g.add((person_uri, BASE.has_name, Literal(author["name"])))
-
-        enriched_info = get_enriched_author_info(author["name"])
+    return authors_by_name.get(author_name)
+
+# ------------------------
+# URIs (estables entre ejecuciones)
+# ------------------------
+def normalize_name(text):
+    text = unicodedata.normalize("NFKD", text or "")
+    text = "".join(c for c in text if not unicodedata.combining(c)).casefold()
+    return " ".join(re.sub(r"[^\w]+", " ", text).split())
+
+def node_id(prefix, key):
+    return f"{prefix}_{hashlib.sha1(key.encode('utf-8')).hexdigest()[:16]}"
+
+def paper_key(paper):
+    """DOI del paper si lo tiene; si no, su fichero."""
+    doi = DOI_RE.search(paper.get("doi") or paper.get("identifier") or "")
+    if doi:
+        return "doi:" + doi.group(0).rstrip(".,;").casefold()
+    return "file:" + paper["filename"]
+
+def paper_node(paper):
+    return URIRef(BASE + node_id("Paper", paper_key(paper)))
+
+def person_node(name, enriched_info):
+    """Por ORCID; sin él, por el nombre normalizado (el mismo autor en varios papers es un nodo)."""
+    if enriched_info and enriched_info.get("orcid_id"):
+        return URIRef(BASE + f"Person_{enriched_info['orcid_id']}")
+    return URIRef(BASE + node_id("Person", normalize_name(name)))
+
+def entity_node(prefix, wikidata_uri, name):
+    """Por QID de Wikidata; sin él, por el nombre normalizado (None si no tiene ninguno)."""
+    if wikidata_uri:
+        return URIRef(BASE + f"{prefix}_{wikidata_uri.rstrip('/').rsplit('/', 1)[-1]}")
+    if normalize_name(name):
+        return URIRef(BASE + node_id(prefix, normalize_name(name)))
+    return None
+
+def field(record, *keys):
+    """Primer valor presente: claves `has_*` de wikidata.py y, si no, las antiguas."""
+    return next((record[k] for k in keys if record.get(k)), None)
+
+# Propiedad RDF → claves del registro enriquecido (la de wikidata.py primero)
+ENTITY_PROPERTIES = [
+    (BASE.has_wikidata_uri, ("has_wikidata_uri", "wikidata_uri")),
+    (BASE.has_located_country, ("has_located_country", "country")),
+    (BASE.has_website, ("has_website", "website")),
+    (BASE.has_start_date, ("has_start_date", "start_date")),
+    (BASE.has_end_date, ("has_end_date", "end_date")),
+    (BASE.has_funder, ("has_funder", "funder")),
+]
+
+def entity_properties(uri, record):
+    for prop, keys in ENTITY_PROPERTIES:
+        value = field(record, *keys)
+        if value:
+            yield (uri, prop, Literal(value))
+
+def is_shared(node):
+    return isinstance(node, URIRef) and str(node).startswith(SHARED_PREFIXES)
+
+# ------------------------
+# Triples
+# ------------------------
+def corpus_reference_ids(papers):
+    # Papers del corpus por su id canónico de referencia, para enlazar las citas entre ellos
+    corpus_ref_ids = {}
+    for paper in papers:
+        first_author = [a["name"] for a in paper.get("authors", [])[:1]]
+        key = reference_key({"title": paper.get("title"), "authors": first_author})
+        if key:
+            corpus_ref_ids[reference_id(key)] = str(paper_node(paper))
+    return corpus_ref_ids
+
+def ref_ids(paper):
+    for ref in paper.get("references", []):
+        if "ref_id" in ref:
+            yield ref["ref_id"]
+        else:
+            key = reference_key(ref)
+            yield reference_id(key) if key else None
+
+def paper_record(paper, corpus_ref_ids):
+    """Todo lo que determina los triples de un paper: el propio paper, la
+    información enriquecida de sus autores y las citas a papers del corpus."""
+    return {
+        "paper": paper,
+        "authors": [get_enriched_author_info(a["name"]) for a in paper.get("authors", [])],
+        "cites": {r: corpus_ref_ids[r] for r in ref_ids(paper) if r in corpus_ref_ids},
+    }
+
+def record_hash(record):
+    return hashlib.sha1(json.dumps(record, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+def paper_triples(record):
+    """Triples de un paper (autores, referencias, organizaciones y proyectos).
+
+    Depende solo de `record`, así que con el registro guardado de una
+    ejecución anterior se regeneran exactamente sus triples de entonces.
+    """
+    paper = record["paper"]
+    paper_uri = paper_node(paper)
+    described = set()
+    yield (paper_uri, RDF.type, BASE.Paper)
+    yield (paper_uri, BASE.has_title, Literal(paper["title"]))
+    yield (paper_uri, BASE.has_date, Literal(paper["publication_date"]))
+
+    for author, enriched_info in zip(paper.get("authors", []), record["authors"]):
+        person_uri = person_node(author["name"], enriched_info)
+        yield (paper_uri, BASE.has_author, person_uri)
+        if person_uri in described:
+            continue
+        described.add(person_uri)
+        yield (person_uri, RDF.type, BASE.Person)
+        yield (person_uri, BASE.has_name, Literal(author["name"]))
+
         if enriched_info:
             if enriched_info.get("work_count"):
-                g.add((person_uri, BASE.has_work_count, Literal(enriched_info["work_count"])))
+                yield (person_uri, BASE.has_work_count, Literal(enriched_info["work_count"]))
             if enriched_info.get("other_names"):
                 for other_name in enriched_info["other_names"]:
-                    g.add((person_uri, BASE.has_other_name, Literal(other_name)))
+                    yield (person_uri, BASE.has_other_name, Literal(other_name))
             if enriched_info.get("external_ids"):
                 for ext_id in enriched_info["external_ids"]:
                     if ext_id.get("type") == "ORCID":
-                        g.add((person_uri, BASE.has_orcid, Literal(ext_id.get("value"))))
+                        yield (person_uri, BASE.has_orcid, Literal(ext_id.get("value")))
             if enriched_info.get("researcher_urls"):
                 for url in enriched_info["researcher_urls"]:
-                    g.add((person_uri, BASE.has_researcher_url, Literal(url.get("url"))))
+                    yield (person_uri, BASE.has_researcher_url, Literal(url.get("url")))
             for edu in enriched_info.get("education", []):
                 if edu.get("institution"):
-                    g.add((person_uri, BASE.has_education_institution, Literal(edu["institution"])))
+                    yield (person_uri, BASE.has_education_institution, Literal(edu["institution"]))
                 if edu.get("city"):
-                    g.add((person_uri, BASE.has_education_city, Literal(edu["city"])))
+                    yield (person_uri, BASE.has_education_city, Literal(edu["city"]))
                 if edu.get("country"):
-                    g.add((person_uri, BASE.has_education_country, Literal(edu["country"])))
+                    yield (person_uri, BASE.has_education_country, Literal(edu["country"]))
             for emp in enriched_info.get("employment", []):
                 if emp.get("institution"):
-                    g.add((person_uri, BASE.has_employment_institution, Literal(emp["institution"])))
+                    yield (person_uri, BASE.has_employment_institution, Literal(emp["institution"]))
                 if emp.get("city"):
-                    g.add((person_uri, BASE.has_employment_city, Literal(emp["city"])))
+                    yield (person_uri, BASE.has_employment_city, Literal(emp["city"]))
                 if emp.get("country"):
-                    g.add((person_uri, BASE.has_employment_country, Literal(emp["country"])))
+                    yield (person_uri, BASE.has_employment_country, Literal(emp["country"]))
 
-        g.add((paper_uri, BASE.has_author, person_uri))
-
-    # Referencias
-    for ref_idx, ref in enumerate(paper.get("references", [])):
-        ref_paper_id = f"Reference_{idx+1}_{ref_idx+1}"
-        ref_uri = URIRef(BASE + ref_paper_id)
-        g.add((ref_uri, RDF.type, BASE.Paper))
+    # Referencias (un único nodo por obra citada, identificado por su ref_id canónico)
+    for ref_idx, (ref, ref_id) in enumerate(zip(paper.get("references", []), ref_ids(paper))):
+        if ref_id in record["cites"]:
+            yield (paper_uri, BASE.references, URIRef(record["cites"][ref_id]))
+            continue
+        ref_uri = URIRef(BASE + (ref_id or node_id("Reference", f"{paper_key(paper)}|{ref_idx}")))
+        yield (paper_uri, BASE.references, ref_uri)
+        if ref_uri in described:
+            continue
+        described.add(ref_uri)
+        yield (ref_uri, RDF.type, BASE.Paper)
         if ref.get("title"):
-            g.add((ref_uri, BASE.has_title, Literal(ref["title"])))
+            yield (ref_uri, BASE.has_title, Literal(ref["title"]))
         if ref.get("identifier"):
-            g.add((ref_uri, BASE.has_identifier, Literal(ref["identifier"])))
-        g.add((paper_uri, BASE.references, ref_uri))
+            yield (ref_uri, BASE.has_identifier, Literal(ref["identifier"]))
 
     # Organizaciones enriquecidas
     for org in paper.get("enriched_organizations", []):
-        org_id = f"Org_{uuid.uuid4().hex[:8]}"
-        org_uri = URIRef(BASE + org_id)
-        g.add((org_uri, RDF.type, BASE.Organization))
-        if org.get("label"):
-            g.add((org_uri, BASE.has_name_organization, Literal(org["label"])))
-        elif org.get("name"):
-            g.add((org_uri, BASE.has_name_organization, Literal(org["name"])))
-        if org.get("wikidata_uri"):
-            g.add((org_uri, BASE.has_wikidata_uri, Literal(org["wikidata_uri"])))
-        if org.get("country"):
-            g.add((org_uri, BASE.has_located_country, Literal(org["country"])))
-        if org.get("website"):
-            g.add((org_uri, BASE.has_website, Literal(org["website"])))
-        if org.get("start_date"):
-            g.add((org_uri, BASE.has_start_date, Literal(org["start_date"])))
-        if org.get("end_date"):
-            g.add((org_uri, BASE.has_end_date, Literal(org["end_date"])))
-        if org.get("funder"):
-            g.add((org_uri, BASE.has_funder, Literal(org["funder"])))
-        g.add((paper_uri, BASE.acknowledges, org_uri))
+        name = field(org, "has_name_organization", "label", "name")
+        org_uri = entity_node("Org", field(org, "has_wikidata_uri", "wikidata_uri"), name)
+        if org_uri is None:
+            continue
+        yield (paper_uri, BASE.acknowledges, org_uri)
+        if org_uri in described:
+            continue
+        described.add(org_uri)
+        yield (org_uri, RDF.type, BASE.Organization)
+        if name:
+            yield (org_uri, BASE.has_name_organization, Literal(name))
+        yield from entity_properties(org_uri, org)
 
     # Proyectos enriquecidos
     for proj in paper.get("enriched_projects", []):
-        proj_id = f"Project_{uuid.uuid4().hex[:8]}"
-        proj_uri = URIRef(BASE + proj_id)
-        g.add((proj_uri, RDF.type, BASE.Project))
-        if proj.get("label"):
-            g.add((proj_uri, BASE.has_id_project, Literal(proj["label"])))
-        if proj.get("wikidata_uri"):
-            g.add((proj_uri, BASE.has_wikidata_uri, Literal(proj["wikidata_uri"])))
-        if proj.get("country"):
-            g.add((proj_uri, BASE.has_located_country, Literal(proj["country"])))
-        if proj.get("website"):
-            g.add((proj_uri, BASE.has_website, Literal(proj["website"])))
-        if proj.get("start_date"):
-            g.add((proj_uri, BASE.has_start_date, Literal(proj["start_date"])))
-        if proj.get("end_date"):
-            g.add((proj_uri, BASE.has_end_date, Literal(proj["end_date"])))
-        if proj.get("funder"):
-            g.add((proj_uri, BASE.has_funder, Literal(proj["funder"])))
+        label = field(proj, "has_id_project", "label")
+        proj_uri = entity_node("Project", field(proj, "has_wikidata_uri", "wikidata_uri"), label)
+        if proj_uri is None or proj_uri in described:
+            continue
+        described.add(proj_uri)
+        yield (proj_uri, RDF.type, BASE.Project)
+        if label:
+            yield (proj_uri, BASE.has_id_project, Literal(label))
+        yield from entity_properties(proj_uri, proj)
 
 # ------------------------
 # Añadir Topics y Similitud
 # ------------------------
-similarity_folder = "outputs/similarities_semantic_by_topic/"
-if os.path.exists(similarity_folder):
+def topic_triples(similarity_folder, paper_uri_map):
+    if not os.path.exists(similarity_folder):
+        return
     for file_path in glob.glob(os.path.join(similarity_folder, "topic_*.json")):
         topic_name = os.path.splitext(os.path.basename(file_path))[0].replace("topic_", "")
         topic_uri = URIRef(BASE + f"Topic_{topic_name}")
-        g.add((topic_uri, RDF.type, BASE.Topic))
-        g.add((topic_uri, BASE.has_name_topic, Literal(topic_name)))
+        yield (topic_uri, RDF.type, BASE.Topic)
+        yield (topic_uri, BASE.has_name_topic, Literal(topic_name))
 
         with open(file_path, "r", encoding="utf-8") as f:
             data = json.load(f)
@@ -145,26 +273,363 @@ if os.path.exists(similarity_folder):
                 if uri1 and uri2:
                     print(uri1)
                     # Similaridad entre papers
-                    g.add((uri1, BASE.similar_to, uri2))
+                    yield (uri1, BASE.similar_to, uri2)
 
                     # TopicBelonging paper1
-                    tb1_id = f"TB_{uuid.uuid4().hex[:8]}"
-                    tb1_uri = URIRef(BASE + tb1_id)
-                    g.add((tb1_uri, RDF.type, BASE.TopicBelonging))
-                    g.add((tb1_uri, BASE.has_paper, uri1))
-                    g.add((tb1_uri, BASE.has_topic, topic_uri))
+                    tb1_uri = URIRef(BASE + node_id("TB", f"{topic_name}|{uri1}|{uri2}"))
+                    yield (tb1_uri, RDF.type, BASE.TopicBelonging)
+                    yield (tb1_uri, BASE.has_paper, uri1)
+                    yield (tb1_uri, BASE.has_topic, topic_uri)
                     if similarity:
-                        g.add((tb1_uri, BASE.has_percentage, Literal(float(similarity))))
+                        yield (tb1_uri, BASE.has_percentage, Literal(float(similarity)))
 
                     # TopicBelonging paper2
-                    tb2_id = f"TB_{uuid.uuid4().hex[:8]}"
-                    tb2_uri = URIRef(BASE + tb2_id)
-                    g.add((tb2_uri, RDF.type, BASE.TopicBelonging))
-                    g.add((tb2_uri, BASE.has_paper, uri2))
-                    g.add((tb2_uri, BASE.has_topic, topic_uri))
+                    tb2_uri = URIRef(BASE + node_id("TB", f"{topic_name}|{uri2}|{uri1}"))
+                    yield (tb2_uri, RDF.type, BASE.TopicBelonging)
+                    yield (tb2_uri, BASE.has_paper, uri2)
+                    yield (tb2_uri, BASE.has_topic, topic_uri)
                     if similarity:
-                        g.add((tb2_uri, BASE.has_percentage, Literal(float(similarity))))
+                        yield (tb2_uri, BASE.has_percentage, Literal(float(similarity)))
+
+def topics_hash(similarity_folder, paper_uri_map):
+    """Cambia si cambian los ficheros de similitud o los papers del corpus que nombran."""
+    h = hashlib.sha1()
+    named = set()
+    for file_path in sorted(glob.glob(os.path.join(similarity_folder, "topic_*.json"))):
+        with open(file_path, "rb") as f:
+            content = f.read()
+        h.update(file_path.encode("utf-8"))
+        h.update(content)
+        for relation in json.loads(content):
+            named.update((relation["paper1"], relation["paper2"]))
+    for filename in sorted(named):
+        h.update(f"{filename}|{paper_uri_map.get(filename)}".encode("utf-8"))
+    return h.hexdigest()
+
+class TripleSet:
+    """Triples ya vistos, en una base SQLite temporal en disco (se borra al
+    cerrarla): solo guarda un hash por triple, así la memoria no crece con el grafo."""
+
+    def __init__(self):
+        self.conn = sqlite3.connect("")
+        self.conn.execute("CREATE TABLE seen (digest BLOB PRIMARY KEY) WITHOUT ROWID")
+
+    def add(self, triple):
+        """True si el triple no estaba ya."""
+        digest = hashlib.sha1(nt_line(triple).encode("utf-8")).digest()
+        return self.conn.execute("INSERT OR IGNORE INTO seen VALUES (?)", (digest,)).rowcount == 1
+
+    def close(self):
+        self.conn.close()
+
+def build_triples(papers_path, similarity_folder=SIMILARITY_FOLDER, state=None):
+    """Todos los triples del grafo, paper a paper (sin acumularlos).
+
+    Cada triple de los nodos compartidos (autores, organizaciones, proyectos,
+    referencias) se escribe una sola vez: el grafo es la unión de lo que
+    afirma cada paper, sin depender de su orden. Los ya escritos se recuerdan
+    en un `TripleSet` en disco. Con `state`, registra además cada paper para
+    el modo incremental.
+    """
+    corpus_ref_ids = corpus_reference_ids(iter_papers(papers_path))
+    emitted = TripleSet()
+    paper_uri_map = {}
+    try:
+        for paper in iter_papers(papers_path):
+            paper_uri_map[paper["filename"]] = paper_node(paper)  # para similar_to
+            record = paper_record(paper, corpus_ref_ids)
+            triples = list(dict.fromkeys(paper_triples(record)))  # sin repetidos dentro del paper
+            if state is not None:
+                state.put(paper_key(paper), record, triples)
+            for triple in triples:
+                if not is_shared(triple[0]) or emitted.add(triple):
+                    yield triple
+    finally:
+        emitted.close()
+    yield from topic_triples(similarity_folder, paper_uri_map)
+    if state is not None:
+        state.set_meta("topics", topics_hash(similarity_folder, paper_uri_map))
+
+# ------------------------
+# Modo incremental
+# ------------------------
+class GraphState:
+    """Papers ya volcados al grafo: hash y registro de cada uno (para regenerar
+    sus triples de entonces) y los nodos compartidos que usa."""
+
+    def __init__(self, path):
+        self.conn = sqlite3.connect(path)
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS papers (key TEXT PRIMARY KEY, hash TEXT NOT NULL, record TEXT NOT NULL);
+            CREATE TABLE IF NOT EXISTS nodes (node TEXT NOT NULL, key TEXT NOT NULL, PRIMARY KEY (node, key));
+            CREATE INDEX IF NOT EXISTS nodes_key ON nodes (key);
+            CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT NOT NULL);
+        """)
+
+    def __len__(self):
+        return self.conn.execute("SELECT COUNT(*) FROM papers").fetchone()[0]
+
+    def clear(self):
+        for table in ("papers", "nodes", "meta"):
+            self.conn.execute(f"DELETE FROM {table}")
+
+    def hashes(self):
+        return dict(self.conn.execute("SELECT key, hash FROM papers"))
+
+    def record(self, key):
+        row = self.conn.execute("SELECT record FROM papers WHERE key = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put(self, key, record, triples):
+        self.delete(key)
+        self.conn.execute("INSERT INTO papers VALUES (?, ?, ?)",
+                          (key, record_hash(record), json.dumps(record, ensure_ascii=False)))
+        nodes = {str(n) for s, _, o in triples for n in (s, o) if is_shared(n)}
+        self.conn.executemany("INSERT INTO nodes VALUES (?, ?)", [(n, key) for n in nodes])
+
+    def delete(self, key):
+        self.conn.execute("DELETE FROM papers WHERE key = ?", (key,))
+        self.conn.execute("DELETE FROM nodes WHERE key = ?", (key,))
+
+    def users(self, node):
+        return [k for (k,) in self.conn.execute("SELECT key FROM nodes WHERE node = ?", (node,))]
+
+    def unused(self, nodes):
+        """Los de `nodes` que ya no usa ningún paper."""
+        return {n for n in nodes
+                if not self.conn.execute("SELECT 1 FROM nodes WHERE node = ? LIMIT 1", (n,)).fetchone()}
+
+    def get_meta(self, name):
+        row = self.conn.execute("SELECT value FROM meta WHERE name = ?", (name,)).fetchone()
+        return row[0] if row else None
+
+    def set_meta(self, name, value):
+        self.conn.execute("INSERT OR REPLACE INTO meta VALUES (?, ?)", (name, value))
+
+    def commit(self):
+        self.conn.commit()
+
+def graph_delta(papers_path, state, similarity_folder=SIMILARITY_FOLDER):
+    """Delta del grafo respecto a lo registrado en `state` (que queda actualizado).
+
+    Solo se generan los triples de los papers nuevos, cambiados o eliminados
+    (los de antes, desde su registro guardado). Devuelve
+    `(añadir, quitar, sujetos_a_borrar, rehacer_topics)`.
+    """
+    corpus_ref_ids = corpus_reference_ids(iter_papers(papers_path))
+    previous = state.hashes()
+    added, removed, asserted, old_nodes, changed = set(), set(), set(), set(), set()
+    paper_uri_map = {}
+
+    def replace(key, old, new):
+        old_triples = set(paper_triples(old)) if old else set()
+        new_triples = set(paper_triples(new)) if new else set()
+        added.update(new_triples - old_triples)
+        removed.update(old_triples - new_triples)
+        asserted.update(new_triples)
+        old_nodes.update(str(n) for s, _, o in old_triples for n in (s, o) if is_shared(n))
+        changed.add(key)
+        if new:
+            state.put(key, new, new_triples)
+        else:
+            state.delete(key)
+
+    for paper in iter_papers(papers_path):
+        paper_uri_map[paper["filename"]] = paper_node(paper)
+        key = paper_key(paper)
+        record = paper_record(paper, corpus_ref_ids)
+        if previous.pop(key, None) != record_hash(record):
+            replace(key, state.record(key), record)
+    for key in previous:  # papers que ya no están
+        replace(key, state.record(key), None)
+
+    # Un triple de un nodo compartido solo se quita si ya no lo afirma ningún
+    # paper: ni los cambiados ni los demás que usan el nodo (regenerados desde
+    # su registro). Los nodos que ya no usa nadie se borran enteros.
+    unchanged = {}
+
+    def asserted_elsewhere(triple):
+        for key in state.users(str(triple[0])):
+            if key in changed:
+                continue
+            if key not in unchanged:
+                unchanged[key] = set(paper_triples(state.record(key)))
+            if triple in unchanged[key]:
+                return True
+        return False
+
+    drop_subjects = {URIRef(n) for n in state.unused(old_nodes)}
+    removed = {t for t in removed - asserted if not is_shared(t[0]) or not asserted_elsewhere(t)}
+
+    topics = topics_hash(similarity_folder, paper_uri_map)
+    redo_topics = topics != state.get_meta("topics")
+    if redo_topics:
+        added.update(topic_triples(similarity_folder, paper_uri_map))
+        state.set_meta("topics", topics)
+    return added, removed, drop_subjects, redo_topics
+
+def is_topic_triple(s, p):
+    return str(p) == str(BASE.similar_to) or str(s).startswith(TOPIC_PREFIXES)
+
+# ------------------------
+# Salida
+# ------------------------
+_NT_ESCAPES = str.maketrans({"\\": "\\\\", '"': '\\"', "\n": "\\n", "\r": "\\r"})
+
+def nt_term(term):
+    if isinstance(term, Literal):
+        text = '"' + str(term).translate(_NT_ESCAPES) + '"'
+        if term.language:
+            return f"{text}@{term.language}"
+        if term.datatype:
+            return f"{text}^^<{term.datatype}>"
+        return text
+    return f"<{term}>"
+
+def nt_line(triple):
+    s, p, o = triple
+    return f"{nt_term(s)} {nt_term(p)} {nt_term(o)} .\n"
+
+def _opener(path):
+    return gzip.open if path.endswith(".gz") else open
+
+def write_ntriples(triples, path):
+    """Escribe cada triple en cuanto se genera (N-Triples, gzip si `path` acaba en .gz)."""
+    count = 0
+    with _opener(path)(path, "wt", encoding="utf-8") as f:
+        for triple in triples:
+            f.write(nt_line(triple))
+            count += 1
+    return count
+
+def patch_ntriples(path, added, removed, drop_subjects, redo_topics):
+    """Aplica el delta a un N-Triples sin cargarlo en memoria: si solo hay que
+    añadir, se añade al final; si no, se copia línea a línea sin lo que sobra.
+    En los dos casos no se repiten las líneas que el fichero ya tiene."""
+    opener = _opener(path)
+    added_lines = {nt_line(t) for t in added}
+    if not (removed or drop_subjects or redo_topics):
+        if any(is_shared(t[0]) for t in added):
+            # otro paper puede haber escrito ya los triples de un nodo compartido
+            with opener(path, "rt", encoding="utf-8") as src:
+                added_lines.difference_update(src)
+    else:
+        removed_lines = {nt_line(t) for t in removed}
+        subjects = {nt_term(s) for s in drop_subjects}
+        tmp = path + ".tmp"
+        with opener(path, "rt", encoding="utf-8") as src, opener(tmp, "wt", encoding="utf-8") as dst:
+            for line in src:
+                s, p, _ = line.split(" ", 2)
+                if (line in removed_lines or s in subjects
+                        or (redo_topics and is_topic_triple(s[1:-1], p[1:-1]))):
+                    continue
+                added_lines.discard(line)
+                dst.write(line)
+        os.replace(tmp, path)
+    with opener(path, "at", encoding="utf-8") as f:
+        f.writelines(sorted(added_lines))
+
+def patch_turtle(path, added, removed, drop_subjects, redo_topics):
+    g = Graph()
+    g.bind("base", BASE)
+    g.parse(path, format="turtle")
+    for triple in removed:
+        g.remove(triple)
+    for s in drop_subjects:
+        g.remove((s, None, None))
+    if redo_topics:
+        for triple in [t for t in g if is_topic_triple(t[0], t[1])]:
+            g.remove(triple)
+    for triple in added:
+        g.add(triple)
+    g.serialize(path, format="turtle")
+
+def write_turtle(triples, path):
+    g = Graph()
+    g.bind("base", BASE)
+    for triple in triples:
+        g.add(triple)
+    g.serialize(path, format="turtle")
+    return len(g)
+
+def read_graph(path, fmt):
+    g = Graph()
+    if fmt == "nt":
+        with _opener(path)(path, "rt", encoding="utf-8") as f:
+            g.parse(data=f.read(), format="nt")
+    else:
+        g.parse(path, format="turtle")
+    return g
+
+def check_graph(path, fmt, papers_path):
+    """`(sobran, faltan, repetidas)`: triples de `path` que no da una
+    reconstrucción completa en memoria y al revés, y líneas N-Triples
+    repetidas (que el grafo, al ser un conjunto, no ve)."""
+    current = read_graph(path, fmt)
+    repeated = 0
+    if fmt == "nt":
+        with _opener(path)(path, "rt", encoding="utf-8") as f:
+            repeated = sum(1 for line in f if line.strip()) - len(current)
+    expected = Graph()
+    for triple in build_triples(papers_path):
+        expected.add(triple)
+    # normaliza los literales como al leerlos de disco
+    expected = Graph().parse(data=expected.serialize(format="nt"), format="nt")
+    return set(current) - set(expected), set(expected) - set(current), repeated
+
+def main(argv=None):
+    global authors_by_name
+    parser = argparse.ArgumentParser(description="Construye el knowledge graph RDF del corpus.")
+    parser.add_argument("--input", default=PAPERS_PATH, help="papers (.json o .jsonl)")
+    parser.add_argument("--format", choices=["turtle", "nt"], default="turtle",
+                        help="turtle (grafo en memoria) o nt (N-Triples en streaming)")
+    parser.add_argument("--gzip", action="store_true", help="con --format nt, comprime la salida")
+    parser.add_argument("--output", default=None, help="fichero de salida")
+    parser.add_argument("--incremental", action="store_true",
+                        help="aplica al grafo existente solo el delta de los papers nuevos, cambiados o eliminados")
+    parser.add_argument("--check", action="store_true",
+                        help="al terminar, comprueba que el grafo coincide con una reconstrucción completa")
+    args = parser.parse_args(argv)
+
+    with open(ENRICHED_AUTHORS_PATH, "r", encoding="utf-8") as f:
+        authors_by_name = build_author_index(json.load(f))
+
+    if args.format == "nt":
+        output = args.output or NTRIPLES_PATH + (".gz" if args.gzip else "")
+    else:
+        output = args.output or TURTLE_PATH
+    state = GraphState(f"{output}.state.sqlite") if args.incremental else None
+
+    if state is not None and len(state) and os.path.exists(output):
+        added, removed, drop_subjects, redo_topics = graph_delta(args.input, state)
+        patch = patch_ntriples if args.format == "nt" else patch_turtle
+        patch(output, added, removed, drop_subjects, redo_topics)
+        state.commit()
+        print(f"Knowledge graph actualizado en {output} (+{len(added)} / -{len(removed)} triples, "
+              f"{len(drop_subjects)} nodos eliminados{', topics rehechos' if redo_topics else ''})")
+    else:
+        if state is not None:
+            state.clear()
+        triples = build_triples(args.input, state=state)
+        if args.format == "nt":
+            count = write_ntriples(triples, output)
+        else:
+            count = write_turtle(triples, output)
+        if state is not None:
+            state.commit()
+        print(f"Knowledge graph guardado en {output} ({count} triples)")
+
+    if args.check:
+        extra, missing, repeated = check_graph(output, args.format, args.input)
+        if extra or missing or repeated:
+            print(f"❌ El grafo no coincide con una reconstrucción completa: "
+                  f"{len(extra)} triples de más, {len(missing)} de menos, {repeated} líneas repetidas")
+            for s, p, o in sorted(extra)[:10]:
+                print(f"  + {s} {p} {o}")
+            for s, p, o in sorted(missing)[:10]:
+                print(f"  - {s} {p} {o}")
+            raise SystemExit(1)
+        print("✅ El grafo coincide con una reconstrucción completa")
 
-# Guardar como Turtle
-g.serialize("outputs/knowledge_graph.ttl", format="turtle")
-print("Knowledge graph guardado en outputs/knowledge_graph.ttl")
+if __name__ == "__main__":
+    main()
@@ -3,37 +3,126 @@
 ───────────────────────────────────────────────────────────────────────────────
 • Hugging Face (`dslim/bert‑base‑NER`) → candidatos ORG/MISC.
 • Heurística muy ligera para *grant‑id*   → siempre **project**.
-• Consulta compacta a Wikidata (API `wbsearchentities` + `P31`).
+• Consulta compacta a Wikidata (API `wbsearchentities` + `P31` vía
+  `wbgetentities`, de 50 en 50): todas las candidatas del corpus se resuelven
+  juntas, con búsquedas concurrentes y límite de ritmo. Si existe el índice
+  local (`wikidata_index.py`) se usa en su lugar, sin red.
   - Si la etiqueta coincide exactamente, determina si es **organization**
     o **project** (listados QIDs mínimos).
   - Si no se puede clasificar ⇒ se descarta.
+  - Resultados cacheados en SQLite (`outputs/wikidata_cache.sqlite`) con TTL.
+• Inferencia por lotes: los agradecimientos se trocean en frases/ventanas,
+  se agrupan por longitud en tokens y pasan por el modelo en lotes.
+• Backend opcional ONNX Runtime (int8, cuantización dinámica) para CPU:
+  `NER_BACKEND=onnx python ner.py`; el modelo exportado se cachea en `models/`.
+  `python ner.py --compare-backends` mide la concordancia con PyTorch.
+• El modelo se carga de forma perezosa (`get_ner()`). Con `--workers N` los
+  artículos se reparten en N trozos, cada proceso carga el modelo una vez y
+  los resultados se fusionan; `--threads` fija los hilos intra‑op por proceso.
+• Gazetteer Aho‑Corasick (`gazetteer.py`) con las orgs / proyectos ya
+  confirmados: se buscan primero en el texto y solo el resto pasa por el
+  modelo. Crece con cada entidad que confirma Wikidata.
 • Actualiza `outputs/papers_metadata_ner.json`.
 
 Dependencias
 ~~~~~~~~~~~~
 ```bash
 pip install transformers torch requests tqdm
+pip install "optimum[onnxruntime]"   # solo para NER_BACKEND=onnx
 ```
 """
 from __future__ import annotations
 
+import argparse
+import asyncio
 import json
+import multiprocessing as mp
+import os
 import re
+import sqlite3
+import threading
+import time
 import unicodedata
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import List, Dict
+from typing import List, Dict, Iterable
 
 import requests
 from tqdm import tqdm
 from transformers import AutoTokenizer, AutoModelForTokenClassification, pipeline
 
+from gazetteer import Gazetteer
+from wikidata_index import open_index
+
 ###############################################################################
 # 1 · MODELO HUGGING FACE                                                    #
 ###############################################################################
-print("🔎  Cargando modelo Hugging Face …")
-_tok  = AutoTokenizer.from_pretrained("dslim/bert-base-NER")
-_model = AutoModelForTokenClassification.from_pretrained("dslim/bert-base-NER")
-ner    = pipeline("ner", model=_model, tokenizer=_tok, aggregation_strategy="simple")
+MODEL_NAME  = "dslim/bert-base-NER"
+ONNX_DIR    = Path(__file__).resolve().parent / "models/bert-base-NER-onnx-int8"
+ONNX_FILE   = "model_quantized.onnx"
+NER_BACKEND = os.environ.get("NER_BACKEND", "torch")   # torch | onnx
+NER_THREADS = int(os.environ.get("NER_THREADS", 0)) or None   # hilos intra‑op (None = defecto)
+
+_tok = None
+_ner = None
+
+def set_threads(threads: int | None) -> None:
+    """Hilos intra‑op de PyTorch / ONNX Runtime para este proceso."""
+    global NER_THREADS
+    NER_THREADS = threads
+    if threads:
+        import torch
+        torch.set_num_threads(threads)
+
+def load_onnx_model():
+    """Modelo ONNX cuantizado (int8 dinámico); se exporta una sola vez a `ONNX_DIR`."""
+    try:
+        from optimum.onnxruntime import ORTModelForTokenClassification, ORTQuantizer
+        from optimum.onnxruntime.configuration import AutoQuantizationConfig
+    except ImportError as e:
+        raise ImportError('El backend ONNX necesita: pip install "optimum[onnxruntime]"') from e
+
+    if not (ONNX_DIR / ONNX_FILE).exists():
+        print("⚙️  Exportando a ONNX y cuantizando a int8 (solo la primera vez) …")
+        fp32 = ORTModelForTokenClassification.from_pretrained(MODEL_NAME, export=True)
+        fp32.save_pretrained(ONNX_DIR / "fp32")
+        quantizer = ORTQuantizer.from_pretrained(ONNX_DIR / "fp32")
+        qconfig = AutoQuantizationConfig.avx2(is_static=False, per_channel=False)
+        quantizer.quantize(save_dir=ONNX_DIR, quantization_config=qconfig)
+        fp32.config.save_pretrained(ONNX_DIR)
+    session_options = None
+    if NER_THREADS:
+        import onnxruntime
+        session_options = onnxruntime.SessionOptions()
+        session_options.intra_op_num_threads = NER_THREADS
+    return ORTModelForTokenClassification.from_pretrained(
+        ONNX_DIR, file_name=ONNX_FILE, session_options=session_options
+    )
+
+def build_pipeline(backend: str = NER_BACKEND):
+    """Pipeline NER (`aggregation_strategy="simple"`) sobre PyTorch u ONNX Runtime."""
+    if backend == "torch":
+        model = AutoModelForTokenClassification.from_pretrained(MODEL_NAME)
+    elif backend == "onnx":
+        model = load_onnx_model()
+    else:
+        raise ValueError(f"Backend desconocido: {backend!r} (torch | onnx)")
+    return pipeline("ner", model=model, tokenizer=get_tokenizer(), aggregation_strategy="simple")
+
+def get_tokenizer():
+    global _tok
+    if _tok is None:
+        _tok = AutoTokenizer.from_pretrained(MODEL_NAME)
+    return _tok
+
+def get_ner(backend: str | None = None):
+    """Pipeline NER del proceso; se carga la primera vez que se pide."""
+    global _ner
+    if _ner is None:
+        backend = backend or NER_BACKEND
+        print(f"🔎  Cargando modelo Hugging Face ({backend}, pid {os.getpid()}) …")
+        _ner = build_pipeline(backend)
+    return _ner
 
 ###############################################################################
 # 2 · CONSTANTES / REGEX                                                     #
@@ -51,25 +140,120 @@ PROJECT_QIDS = {
     "Q3402703",   # research programme
 }
 WIKIDATA_SEARCH = "https://www.wikidata.org/w/api.php"
-WIKIDATA_ENTITY = "https://www.wikidata.org/wiki/Special:EntityData/{}.json"
+WIKIDATA_HEADERS = {"User-Agent": "KG-Enricher/1.1 (contact@example.com)"}
+WIKIDATA_CONCURRENCY = 8     # peticiones simultáneas
+WIKIDATA_RATE        = 20    # peticiones por segundo
+GETENTITIES_BATCH    = 50    # máximo de ids por llamada wbgetentities
+
+SENT_RE  = re.compile(r"(?<=[.!?;])\s+")
+
+BATCH_SIZE = 16    # trozos por pasada del modelo
+MAX_TOKENS = 128   # tokens por trozo (el modelo admite 512, pero frases cortas ⇒ menos padding)
+
+CACHE_DB           = Path(__file__).resolve().parent / "outputs/wikidata_cache.sqlite"
+CACHE_TTL          = 30 * 24 * 3600   # s · clasificaciones confirmadas
+CACHE_NEGATIVE_TTL = 24 * 3600        # s · "no es org ni proyecto" (se reintenta antes)
+
+GAZETTEER_SEED = os.environ.get("NER_GAZETTEER_SEED")   # JSON {"organizations": [...], "projects": [...]}
 
 GRANT_RE = re.compile(r"(?:grant|contract|award)[^A-Za-z0-9]{0,6}([A-Z0-9\-]{6,})", re.I)
 
 ###############################################################################
 # 3 · UTILIDADES                                                             #
 ###############################################################################
-_cache: dict[str,str] = {}
+_cache: dict[str,str|None] = {}
 
 def clean(txt: str) -> str:
     txt = unicodedata.normalize("NFKC", txt)
     txt = re.sub(r"\s+", " ", txt)
     return txt.strip(" ,;.:")
 
-def classify_wikidata(label: str) -> str | None:
-    """Devuelve 'org' / 'proj' / None si no se puede clasificar."""
-    if label in _cache:
-        return _cache[label]
+def cache_key(label: str) -> str:
+    return clean(label).casefold()
+
+class LabelCache:
+    """Caché persistente (SQLite) de clasificaciones Wikidata por etiqueta normalizada.
+
+    Los aciertos caducan a los `ttl` segundos y los negativos ("no es org ni
+    proyecto") a los `negative_ttl`. WAL + `timeout` permiten que varios
+    procesos/hilos lean y escriban a la vez; cada hilo usa su propia conexión.
+    """
+
+    def __init__(self, path: Path, ttl: float = CACHE_TTL, negative_ttl: float = CACHE_NEGATIVE_TTL):
+        self.path = path
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._local = threading.local()
+
+    def _conn(self) -> sqlite3.Connection:
+        # una conexión por hilo y por proceso (no se puede heredar tras un fork)
+        if getattr(self._local, "pid", None) != os.getpid():
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("CREATE TABLE IF NOT EXISTS labels "
+                         "(key TEXT PRIMARY KEY, kind TEXT, fetched REAL NOT NULL)")
+            conn.commit()
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return self._local.conn
+
+    def get(self, label: str) -> tuple[bool, str | None]:
+        """(encontrado, tipo); las entradas caducadas cuentan como no encontradas."""
+        row = self._conn().execute(
+            "SELECT kind, fetched FROM labels WHERE key = ?", (cache_key(label),)
+        ).fetchone()
+        if row is None:
+            return False, None
+        kind, fetched = row
+        ttl = self.ttl if kind else self.negative_ttl
+        if time.time() - fetched > ttl:
+            return False, None
+        return True, kind
 
+    def put(self, label: str, kind: str | None) -> None:
+        conn = self._conn()
+        conn.execute("INSERT OR REPLACE INTO labels (key, kind, fetched) VALUES (?, ?, ?)",
+                     (cache_key(label), kind, time.time()))
+        conn.commit()
+
+_disk_cache = LabelCache(CACHE_DB)
+_index      = open_index()   # índice local de Wikidata (wikidata_index.py), si existe
+_gazetteer: Gazetteer | None = Gazetteer()   # orgs / proyectos confirmados (None = desactivado)
+
+def classify_local(label: str) -> str | None:
+    """Como `classify_wikidata`, pero desde el índice local (sin red)."""
+    qids = _index.search_exact(label)
+    if not qids:
+        return None
+    p31 = _index.p31(qids[0])
+    return "org" if p31 & ORG_QIDS else "proj" if p31 & PROJECT_QIDS else None
+
+class RateLimiter:
+    """Limita el ritmo de peticiones (`rate` por segundo) entre corrutinas."""
+
+    def __init__(self, rate: float):
+        self.interval = 1 / rate
+        self._next = 0.0
+        self._lock = asyncio.Lock()
+
+    async def wait(self) -> None:
+        async with self._lock:
+            loop = asyncio.get_running_loop()
+            now = loop.time()
+            delay = max(0.0, self._next - now)
+            self._next = max(now, self._next) + self.interval
+        await asyncio.sleep(delay)
+
+async def _get_json(params: dict, limiter: RateLimiter, sem: asyncio.Semaphore) -> dict:
+    async with sem:
+        await limiter.wait()
+        r = await asyncio.to_thread(requests.get, WIKIDATA_SEARCH, params=params,
+                                    headers=WIKIDATA_HEADERS, timeout=6)
+    r.raise_for_status()
+    return r.json()
+
+async def _search(label: str, limiter: RateLimiter, sem: asyncio.Semaphore) -> str | None:
+    """QID cuya etiqueta coincide exactamente con `label` (None si no hay)."""
     params = {
         "action": "wbsearchentities",
         "search": label,
@@ -78,48 +262,146 @@ def classify_wikidata(label: str) -> str | None:
         "type": "item",
         "limit": 5,
     }
-    try:
-        r = requests.get(WIKIDATA_SEARCH, params=params, timeout=6)
-        r.raise_for_status()
-        hits = r.json().get("search", [])
-        hit = next((h for h in hits if h.get("label", "").casefold() == label.casefold()), None)
-        if not hit:
-            _cache[label] = None
-            return None
-        qid = hit["id"]
-        ent = requests.get(WIKIDATA_ENTITY.format(qid), timeout=6).json()
-        p31 = {
+    hits = (await _get_json(params, limiter, sem)).get("search", [])
+    hit = next((h for h in hits if h.get("label", "").casefold() == label.casefold()), None)
+    return hit["id"] if hit else None
+
+async def _fetch_p31(qids: List[str], limiter: RateLimiter, sem: asyncio.Semaphore) -> Dict[str, set]:
+    """`P31` de hasta 50 QIDs en una sola llamada `wbgetentities` (solo claims)."""
+    params = {"action": "wbgetentities", "ids": "|".join(qids), "props": "claims", "format": "json"}
+    entities = (await _get_json(params, limiter, sem)).get("entities", {})
+    return {
+        qid: {
             c["mainsnak"]["datavalue"]["value"]["id"]
-            for c in ent["entities"][qid].get("claims", {}).get("P31", [])
+            for c in entities.get(qid, {}).get("claims", {}).get("P31", [])
             if "datavalue" in c["mainsnak"]
         }
-        if p31 & ORG_QIDS:
-            _cache[label] = "org"
-            return "org"
-        if p31 & PROJECT_QIDS:
-            _cache[label] = "proj"
-            return "proj"
-    except Exception:
-        pass
-    _cache[label] = None
-    return None
+        for qid in qids
+    }
+
+async def _resolve(labels: List[str]) -> Dict[str, str | None]:
+    kinds: Dict[str, str | None] = {}
+    pending: Dict[str, str] = {}          # clave normalizada → etiqueta a consultar
+    for label in labels:
+        key = cache_key(label)
+        if key in _cache:
+            continue
+        found, kind = _disk_cache.get(label)
+        if found:
+            _cache[key] = kind
+        else:
+            pending.setdefault(key, label)
+
+    if _index is not None:
+        # índice local: respuesta definitiva, sin consultar la API
+        for key, label in pending.items():
+            _cache[key] = classify_local(label)
+        pending = {}
+
+    limiter = RateLimiter(WIKIDATA_RATE)
+    sem = asyncio.Semaphore(WIKIDATA_CONCURRENCY)
+
+    # a) búsquedas concurrentes
+    searched = await asyncio.gather(*(_search(l, limiter, sem) for l in pending.values()),
+                                    return_exceptions=True)
+    qid_of: Dict[str, str] = {}
+    for (key, label), res in zip(pending.items(), searched):
+        if isinstance(res, Exception):
+            continue                       # fallo transitorio → sin cachear
+        if res is None:
+            _cache[key] = None
+            _disk_cache.put(label, None)
+        else:
+            qid_of[key] = res
+
+    # b) P31 de todos los QIDs, de 50 en 50
+    qids = sorted(set(qid_of.values()))
+    batches = [qids[i:i + GETENTITIES_BATCH] for i in range(0, len(qids), GETENTITIES_BATCH)]
+    p31: Dict[str, set] = {}
+    for res in await asyncio.gather(*(_fetch_p31(b, limiter, sem) for b in batches),
+                                    return_exceptions=True):
+        if not isinstance(res, Exception):
+            p31.update(res)
+    for key, qid in qid_of.items():
+        if qid not in p31:
+            continue                       # fallo transitorio → sin cachear
+        kind = "org" if p31[qid] & ORG_QIDS else "proj" if p31[qid] & PROJECT_QIDS else None
+        _cache[key] = kind
+        _disk_cache.put(pending[key], kind)
+
+    for label in labels:
+        kinds[label] = _cache.get(cache_key(label))
+    return kinds
+
+def resolve_labels(labels: Iterable[str]) -> Dict[str, str | None]:
+    """Clasifica muchas etiquetas a la vez: 'org' / 'proj' / None por etiqueta.
+
+    Las que no están en caché se buscan en paralelo (`WIKIDATA_CONCURRENCY`
+    peticiones, `WIKIDATA_RATE` por segundo) y el `P31` de los QIDs
+    encontrados se pide en lotes de 50 con `wbgetentities`.
+    """
+    return asyncio.run(_resolve(list(labels)))
+
+def classify_wikidata(label: str) -> str | None:
+    """Devuelve 'org' / 'proj' / None si no se puede clasificar.
+
+    Los fallos de red no se cachean: la etiqueta se vuelve a consultar la
+    próxima vez en lugar de quedar descartada para toda la ejecución.
+    """
+    return resolve_labels([label])[label]
 
 ###############################################################################
 # 4 · EXTRACCIÓN                                                             #
 ###############################################################################
 
+def scan(text: str) -> tuple[list, List[str]]:
+    """Entidades del gazetteer en `text` y trozos restantes para el modelo."""
+    if _gazetteer is None:
+        return [], [text]
+    return _gazetteer.split(text)
+
 def extract_from_ack(text: str) -> Dict[str, List[str]]:
-    orgs, projs = set(), set()
+    known, rest = scan(text)
+    entities = [e for ents in (get_ner()(rest) if rest else []) for e in ents]
+    res = classify_entities(entities, text, known=known)
+    if _gazetteer is not None:
+        _gazetteer.save()
+    return res
 
-    # a) candidates via NER
-    for ent in ner(text):
+def candidates(entities: Iterable[dict]) -> List[str]:
+    """Etiquetas ORG/MISC limpias de las entidades NER (candidatas para Wikidata)."""
+    cands = []
+    for ent in entities:
         if ent["entity_group"] not in {"ORG", "MISC"}:
             continue
         cand = clean(ent["word"])
-        if len(cand) < 3:
-            continue
+        if len(cand) >= 3:
+            cands.append(cand)
+    return cands
+
+def classify_entities(entities: Iterable[dict], text: str,
+                      kinds: Dict[str, str | None] | None = None,
+                      known: Iterable[tuple] = ()) -> Dict[str, List[str]]:
+    """Filtra las entidades NER de un texto y las clasifica en orgs / proyectos.
+
+    `kinds` son las clasificaciones ya resueltas (ver `resolve_labels`); si no
+    se dan, se resuelven aquí las candidatas de este texto. `known` son las
+    coincidencias `(texto, tipo)` del gazetteer, ya clasificadas. Las
+    candidatas que Wikidata confirma se añaden al gazetteer.
+    """
+    orgs, projs = set(), set()
+    for span, typ in known:
+        (orgs if typ == "org" else projs).add(clean(span))
+
+    # a) candidates via NER
+    cands = candidates(entities)
+    if kinds is None:
+        kinds = resolve_labels(set(cands))
+    for cand in cands:
         # check wikidata type
-        typ = classify_wikidata(cand)
+        typ = kinds.get(cand)
+        if typ and _gazetteer is not None:
+            _gazetteer.add(cand, typ)
         if typ == "org":
             orgs.add(cand)
         elif typ == "proj":
@@ -134,6 +416,154 @@ def extract_from_ack(text: str) -> Dict[str, List[str]]:
         "projects": sorted(projs),
     }
 
+def split_chunks(text: str, max_tokens: int = MAX_TOKENS) -> List[str]:
+    """Parte un texto en frases; las que superan `max_tokens` se cortan en ventanas de palabras."""
+    chunks = []
+    for sent in SENT_RE.split(text):
+        words = sent.split()
+        if not words:
+            continue
+        lengths = [len(ids) for ids in get_tokenizer()(words, add_special_tokens=False)["input_ids"]]
+        window, size = [], 0
+        for word, n in zip(words, lengths):
+            if window and size + n > max_tokens:
+                chunks.append(" ".join(window))
+                window, size = [], 0
+            window.append(word)
+            size += n
+        chunks.append(" ".join(window))
+    return chunks
+
+def run_ner(texts: List[str], batch_size: int = BATCH_SIZE, max_tokens: int = MAX_TOKENS,
+            backend: str | None = None) -> List[List[dict]]:
+    """Entidades NER de cada texto (sin Wikidata).
+
+    Todos los trozos se ordenan por longitud en tokens (lotes con poco
+    padding), pasan por el modelo de `batch_size` en `batch_size` y sus
+    entidades se devuelven al texto del que salieron.
+    """
+    entities: List[List[dict]] = [[] for _ in texts]
+    chunks = [(i, c) for i, t in enumerate(texts) for c in split_chunks(t, max_tokens)]
+    if not chunks:
+        return entities
+    lengths = [len(ids) for ids in get_tokenizer()([c for _, c in chunks])["input_ids"]]
+    order = sorted(range(len(chunks)), key=lengths.__getitem__)
+
+    ner = get_ner(backend)
+    for start in tqdm(range(0, len(order), batch_size), desc=f"NER {os.getpid()}", unit="lote"):
+        idxs = order[start:start + batch_size]
+        outputs = ner([chunks[j][1] for j in idxs], batch_size=batch_size)
+        for j, ents in zip(idxs, outputs):
+            entities[chunks[j][0]].extend(ents)
+    return entities
+
+def _init_worker(backend: str, threads: int | None) -> None:
+    set_threads(threads)
+    get_ner(backend)
+
+def _run_shard(args: tuple) -> List[List[dict]]:
+    texts, batch_size, max_tokens = args
+    return run_ner(texts, batch_size, max_tokens)
+
+def shards(n_items: int, n_shards: int) -> List[range]:
+    """Reparte `range(n_items)` en `n_shards` trozos contiguos de tamaño parecido."""
+    size, extra = divmod(n_items, n_shards)
+    out, start = [], 0
+    for k in range(n_shards):
+        end = start + size + (k < extra)
+        out.append(range(start, end))
+        start = end
+    return [r for r in out if r]
+
+def run_ner_sharded(texts: List[str], workers: int, batch_size: int = BATCH_SIZE,
+                    max_tokens: int = MAX_TOKENS, backend: str | None = None,
+                    threads: int | None = None) -> List[List[dict]]:
+    """`run_ner` repartido entre `workers` procesos.
+
+    Cada proceso carga el modelo una sola vez (en el *initializer*) con
+    `threads` hilos intra‑op; por defecto se reparten los núcleos de la
+    máquina para no sobresuscribirla.
+    """
+    threads = threads or max(1, (os.cpu_count() or 1) // workers)
+    parts = shards(len(texts), workers)
+    ctx = mp.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=len(parts), mp_context=ctx, initializer=_init_worker,
+                             initargs=(backend or NER_BACKEND, threads)) as pool:
+        results = pool.map(_run_shard, [([texts[i] for i in r], batch_size, max_tokens) for r in parts])
+        return [ents for part in results for ents in part]
+
+def extract_batch(texts: List[str], batch_size: int = BATCH_SIZE, max_tokens: int = MAX_TOKENS,
+                  workers: int = 1, backend: str | None = None,
+                  threads: int | None = None) -> List[Dict[str, List[str]]]:
+    """`extract_from_ack` para muchos textos a la vez.
+
+    Primero se buscan en cada texto las entidades del gazetteer; solo los
+    trozos restantes pasan por el NER, en este proceso (`workers=1`) o
+    repartido en varios (`run_ner_sharded`). Después todas las candidatas del
+    corpus se resuelven juntas en Wikidata, una sola vez.
+    """
+    scans = [scan(t) for t in texts]
+    pieces = [(i, r) for i, (_, rest) in enumerate(scans) for r in rest]
+    if _gazetteer is not None:
+        left = sum(len(r) for _, r in pieces)
+        total = sum(len(t) for t in texts) or 1
+        print(f"· Gazetteer ({len(_gazetteer)} entradas): {sum(len(k) for k, _ in scans)} "
+              f"coincidencias, {left / total:.0%} del texto pasa al modelo")
+
+    rest = [r for _, r in pieces]
+    if workers > 1 and len(rest) > 1:
+        piece_entities = run_ner_sharded(rest, workers, batch_size, max_tokens, backend, threads)
+    else:
+        set_threads(threads or NER_THREADS)
+        piece_entities = run_ner(rest, batch_size, max_tokens, backend)
+    entities: List[List[dict]] = [[] for _ in texts]
+    for (i, _), ents in zip(pieces, piece_entities):
+        entities[i].extend(ents)
+
+    labels = {c for ents in entities for c in candidates(ents)}
+    print(f"· Resolviendo {len(labels)} candidatas en Wikidata …")
+    kinds = resolve_labels(labels)
+    results = [classify_entities(ents, text, kinds, known)
+               for ents, text, (known, _) in zip(entities, texts, scans)]
+    if _gazetteer is not None:
+        _gazetteer.save()
+    return results
+
+def compare_backends(texts: List[str], max_tokens: int = MAX_TOKENS) -> Dict[str, float]:
+    """Compara el backend ONNX int8 con PyTorch sobre los trozos de `texts`.
+
+    Toma las entidades ORG/MISC de PyTorch como referencia y devuelve
+    precisión / recall / F1 de ONNX (por tipo + texto + posición) y el
+    tiempo por trozo de cada backend.
+    """
+    chunks = [c for t in texts for c in split_chunks(t, max_tokens)]
+    found, times = {}, {}
+    for backend in ("torch", "onnx"):
+        pipe = build_pipeline(backend)
+        start = time.perf_counter()
+        found[backend] = {
+            (i, e["entity_group"], e["word"], e["start"], e["end"])
+            for i, ents in enumerate(pipe(chunks, batch_size=BATCH_SIZE))
+            for e in ents if e["entity_group"] in {"ORG", "MISC"}
+        }
+        times[backend] = (time.perf_counter() - start) / max(len(chunks), 1)
+
+    ref, got = found["torch"], found["onnx"]
+    tp = len(ref & got)
+    precision = tp / len(got) if got else 1.0
+    recall    = tp / len(ref) if ref else 1.0
+    f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+    return {
+        "chunks": len(chunks),
+        "entities_torch": len(ref),
+        "entities_onnx": len(got),
+        "precision": precision,
+        "recall": recall,
+        "f1": f1,
+        "ms_per_chunk_torch": times["torch"] * 1000,
+        "ms_per_chunk_onnx": times["onnx"] * 1000,
+    }
+
 ###############################################################################
 # 5 · I/O                                                                    #
 ###############################################################################
@@ -141,13 +571,45 @@ ROOT = Path(__file__).resolve().parent
 IN_FILE  = ROOT / "outputs/papers_metadata.json"
 OUT_FILE = ROOT / "outputs/papers_metadata_ner.json"
 
-papers = json.loads(IN_FILE.read_text("utf-8"))
-print(f"\n▶ Procesando {len(papers)} artículos …\n")
-for p in tqdm(papers):
-    ack = p.get("acknowledgements", "")
-    res = extract_from_ack(ack)
-    p.update(res)
+def main(argv: List[str] | None = None) -> None:
+    ap = argparse.ArgumentParser(description="NER de organizaciones y proyectos en agradecimientos.")
+    ap.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="trozos por pasada del modelo")
+    ap.add_argument("--max-tokens", type=int, default=MAX_TOKENS, help="tokens máximos por trozo")
+    ap.add_argument("--backend", choices=("torch", "onnx"), default=NER_BACKEND,
+                    help="backend del modelo (por defecto $NER_BACKEND o torch)")
+    ap.add_argument("--workers", type=int, default=int(os.environ.get("NER_WORKERS", 1)),
+                    help="procesos NER; cada uno carga el modelo y procesa un trozo de los artículos")
+    ap.add_argument("--threads", type=int, default=NER_THREADS,
+                    help="hilos intra‑op por proceso (por defecto: núcleos / workers)")
+    ap.add_argument("--gazetteer-seed", default=GAZETTEER_SEED,
+                    help="JSON con orgs / proyectos conocidos para el gazetteer")
+    ap.add_argument("--no-gazetteer", action="store_true",
+                    help="pasa todo el texto por el modelo, sin gazetteer")
+    ap.add_argument("--compare-backends", action="store_true",
+                    help="compara ONNX int8 con PyTorch sobre los agradecimientos y termina")
+    args = ap.parse_args(argv)
+
+    global _gazetteer
+    if args.no_gazetteer:
+        _gazetteer = None
+    elif args.gazetteer_seed:
+        _gazetteer.load_seed(args.gazetteer_seed)
+
+    papers = json.loads(IN_FILE.read_text("utf-8"))
+    acks = [p.get("acknowledgements", "") or "" for p in papers]
+    if args.compare_backends:
+        set_threads(args.threads)
+        print(json.dumps(compare_backends(acks, args.max_tokens), indent=2))
+        return
+    print(f"\n▶ Procesando {len(papers)} artículos con {args.workers} proceso(s) …\n")
+    results = extract_batch(acks, args.batch_size, args.max_tokens,
+                            workers=args.workers, backend=args.backend, threads=args.threads)
+    for p, res in zip(papers, results):
+        p.update(res)
+
+    OUT_FILE.parent.mkdir(exist_ok=True)
+    OUT_FILE.write_text(json.dumps(papers, indent=2, ensure_ascii=False), "utf-8")
+    print(f"\n✓ Resultado guardado en → {OUT_FILE.relative_to(ROOT)}\n")
 
-OUT_FILE.parent.mkdir(exist_ok=True)
-OUT_FILE.write_text(json.dumps(papers, indent=2, ensure_ascii=False), "utf-8")
-print(f"\n✓ Resultado guardado en → {OUT_FILE.relative_to(ROOT)}\n")
+if __name__ == "__main__":
+    main()
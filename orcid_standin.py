@@ -0,0 +1,372 @@
+"""Offline stand-in for the ORCID public API (v3.0).
+
+Serves the ``search``, ``expanded-search``, ``record``, ``educations``,
+``employments``, ``person`` and ``works`` endpoints that ``person.py`` uses, so
+author enrichment can be run, profiled and benchmarked without network access or
+credentials. Responses come from, in order:
+
+1. recorded responses in ``outputs/orcid_fixtures.json`` (see ``--record``),
+   keyed by request path,
+2. profiles synthesized from ``outputs/enriched_authors.json``: every author with
+   an ORCID iD gets a profile with its affiliations, ids, URLs and works (the
+   paper it was found on among them), plus ``--decoys`` homonyms with unrelated
+   institutions and works for every author name.
+
+Point ``person.py`` at it with ``ORCID_API_URL`` (``ORCID_ACCESS_TOKEN`` skips
+the OAuth request):
+
+    python orcid_standin.py --port 8090 --latency 0.3 --rate 24
+    ORCID_API_URL=http://127.0.0.1:8090/v3.0 ORCID_ACCESS_TOKEN=standin python person.py
+    python orcid_standin.py --record
+"""
+import argparse
+import json
+import os
+import random
+import re
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import unquote
+
+ENRICHED_PATH = "outputs/enriched_authors.json"
+METADATA_PATH = "outputs/papers_metadata.json"
+FIXTURES_PATH = "outputs/orcid_fixtures.json"
+API_PREFIX = "/v3.0/"
+DEFAULT_DECOYS = 2
+
+# decoy works are drawn from unrelated fields so that homonyms stay distinguishable
+DECOY_TOPICS = ["soil", "wheat", "cattle", "dairy", "poultry", "vineyard", "orchard", "irrigation",
+                "pediatric", "cardiac", "dental", "surgical", "nursing", "tax", "labour", "tourism",
+                "medieval", "baroque", "poetry", "theatre", "liturgy", "pottery", "folk", "opera"]
+DECOY_FORMS = ["outcomes", "practices", "history", "policy", "yields", "care", "markets", "traditions"]
+
+QUERY_RE = re.compile(r"family-name:(.*?)\+AND\+given-names:(.*?)(?:&|$)")
+
+
+def split_name(full_name):
+    parts = (full_name or "").strip().split()
+    if len(parts) < 2:
+        return full_name or "", ""
+    return parts[0], " ".join(parts[1:])
+
+
+def orcid_from_number(number):
+    """ORCID iD (with a valid ISO 7064 11,2 check digit) for a 15-digit number."""
+    digits = f"{number % 10 ** 15:015d}"
+    total = 0
+    for d in digits:
+        total = (total + int(d)) * 2
+    check = (12 - total % 11) % 11
+    base = digits + ("X" if check == 10 else str(check))
+    return "-".join(base[i:i + 4] for i in range(0, 16, 4))
+
+
+class Directory:
+    """Synthetic ORCID profiles, indexed by (given names, family name)."""
+
+    def __init__(self, enriched_path=ENRICHED_PATH, metadata_path=METADATA_PATH, decoys=DEFAULT_DECOYS, seed=0):
+        enriched = []
+        if os.path.exists(enriched_path):
+            with open(enriched_path, "r", encoding="utf-8") as f:
+                enriched = json.load(f)
+        names = {author["full_name"] for author in enriched}
+        titles = sorted({author.get("paper_cited") or "" for author in enriched} - {""})
+        if os.path.exists(metadata_path):
+            with open(metadata_path, "r", encoding="utf-8") as f:
+                for paper in json.load(f):
+                    titles.append(paper.get("title") or "")
+                    names.update(a.get("name") for a in paper.get("authors", []) if a.get("name"))
+        titles = sorted(set(titles) - {""})
+
+        self.profiles = {}
+        self.by_name = {}
+        for author in enriched:
+            if not author.get("orcid_id"):
+                continue
+            works = [author.get("paper_cited") or ""]
+            rnd = random.Random(zlib.crc32(author["orcid_id"].encode()))
+            works += rnd.sample(titles, min(len(titles), max(0, (author.get("work_count") or 1) - 1)))
+            self.add({**author, "works": [w for w in works if w]})
+
+        institutions = sorted({
+            a["institution"] for author in enriched
+            for a in author.get("education", []) + author.get("employment", []) if a.get("institution")
+        }) or ["Unknown University"]
+        for full_name in sorted(names):
+            rnd = random.Random(zlib.crc32(f"{seed}:{full_name}".encode()))
+            given, family = split_name(full_name)
+            for _ in range(decoys):
+                institution = rnd.choice(institutions)
+                self.add({
+                    "orcid_id": orcid_from_number(rnd.getrandbits(50)),
+                    "given_name": given,
+                    "family_name": family,
+                    "education": [],
+                    "employment": [{"institution": institution, "city": None, "country": None, "role": None,
+                                    "start_year": None, "end_year": None, "identifier": None}],
+                    "external_ids": [],
+                    "researcher_urls": [],
+                    "other_names": [],
+                    "works": [
+                        f"{rnd.choice(DECOY_TOPICS).title()} {rnd.choice(DECOY_FORMS)} in {rnd.choice(DECOY_TOPICS)}"
+                        for _ in range(rnd.randint(0, 5))
+                    ],
+                })
+
+    def add(self, profile):
+        self.profiles[profile["orcid_id"]] = profile
+        key = (profile["given_name"].casefold(), profile["family_name"].casefold())
+        self.by_name.setdefault(key, []).append(profile["orcid_id"])
+
+    def search(self, query):
+        match = QUERY_RE.search(query)
+        if not match:
+            return []
+        family, given = (unquote(part.replace("+", " ")).strip() for part in match.groups())
+        return self.by_name.get((given.casefold(), family.casefold()), [])
+
+    # -- response bodies ---------------------------------------------------
+
+    def search_body(self, query):
+        ids = self.search(query)
+        return {"result": [{"orcid-identifier": {"path": orcid_id}} for orcid_id in ids], "num-found": len(ids)}
+
+    def expanded_search_body(self, query):
+        results = []
+        for orcid_id in self.search(query):
+            profile = self.profiles[orcid_id]
+            results.append({
+                "orcid-id": orcid_id,
+                "given-names": profile["given_name"],
+                "family-names": profile["family_name"],
+                "credit-name": None,
+                "other-name": profile["other_names"],
+                "institution-name": sorted({
+                    a["institution"] for a in profile["education"] + profile["employment"] if a.get("institution")
+                }),
+            })
+        return {"expanded-result": results or None, "num-found": len(results)}
+
+    @staticmethod
+    def affiliations_body(profile, kind):
+        def summary(a):
+            return {
+                "role-title": a.get("role"),
+                "start-date": {"year": {"value": a["start_year"]}} if a.get("start_year") else None,
+                "end-date": {"year": {"value": a["end_year"]}} if a.get("end_year") else None,
+                "organization": {
+                    "name": a.get("institution"),
+                    "address": {"city": a.get("city"), "country": a.get("country")},
+                    "disambiguated-organization": (
+                        {"disambiguated-organization-identifier": a["identifier"]} if a.get("identifier") else None
+                    ),
+                },
+            }
+
+        return {"affiliation-group": [{"summaries": [{f"{kind}-summary": summary(a)}]} for a in profile[kind]]}
+
+    @staticmethod
+    def person_body(profile):
+        return {
+            "external-identifiers": {"external-identifier": [
+                {"external-id-type": e.get("type"), "external-id-value": e.get("value"),
+                 "external-id-url": {"value": e.get("url")}}
+                for e in profile["external_ids"]
+            ]},
+            "researcher-urls": {"researcher-url": [
+                {"url-name": u.get("label"), "url": {"value": u.get("url")}} for u in profile["researcher_urls"]
+            ]},
+            "other-names": {"other-name": [{"content": name} for name in profile["other_names"]]},
+        }
+
+    @staticmethod
+    def works_body(profile):
+        return {"group": [{"work-summary": [{"title": {"title": {"value": title}}}]} for title in profile["works"]]}
+
+    def route(self, path):
+        """``(status, body)`` for a request path relative to ``/v3.0/``."""
+        if path.startswith("search"):
+            return 200, self.search_body(path)
+        if path.startswith("expanded-search"):
+            return 200, self.expanded_search_body(path)
+        orcid_id, _, endpoint = path.partition("/")
+        profile = self.profiles.get(orcid_id)
+        if profile is None:
+            return 404, {"error-code": 9016, "developer-message": f"ORCID iD {orcid_id} not found"}
+        if endpoint == "record":
+            return 200, {
+                "orcid-identifier": {"path": orcid_id},
+                "person": self.person_body(profile),
+                "activities-summary": {
+                    "educations": self.affiliations_body(profile, "education"),
+                    "employments": self.affiliations_body(profile, "employment"),
+                    "works": self.works_body(profile),
+                },
+            }
+        if endpoint == "educations":
+            return 200, self.affiliations_body(profile, "education")
+        if endpoint == "employments":
+            return 200, self.affiliations_body(profile, "employment")
+        if endpoint == "person":
+            return 200, self.person_body(profile)
+        if endpoint == "works":
+            return 200, self.works_body(profile)
+        return 404, {"developer-message": f"Unknown endpoint {endpoint}"}
+
+
+def load_fixtures(path=FIXTURES_PATH):
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def record_responses(fixtures_path=FIXTURES_PATH):
+    """Runs ``person.py``'s enrichment against the real API and saves every 200 response."""
+    import person
+
+    fixtures = load_fixtures(fixtures_path)
+    get_once = person.orcid_client.get_once
+
+    def recording(path):
+        resp = get_once(path)
+        if resp.status_code == 200:
+            fixtures[unquote(path)] = resp.json()
+        return resp
+
+    person.orcid_client.get_once = recording
+    with open(person.INPUT_PATH, "r", encoding="utf-8") as f:
+        papers = json.load(f)
+    person.enrich_authors(papers)
+    with open(fixtures_path, "w", encoding="utf-8") as f:
+        json.dump(fixtures, f, ensure_ascii=False)
+    print(f"Recorded {len(fixtures)} responses to {fixtures_path}")
+
+
+class StandinServer(ThreadingHTTPServer):
+    """HTTP server answering ORCID requests with artificial latency and throttling.
+
+    ``latency`` (seconds) is the mean of an exponential delay per request,
+    ``error_rate`` the fraction of requests answered with 429, and ``rate`` the
+    requests per second allowed (bursts of ``burst``): requests beyond it get a
+    429 with ``Retry-After: 1``, like the real API.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, address, directory, fixtures=None, latency=0.0, error_rate=0.0, rate=None, burst=40,
+                 seed=None):
+        super().__init__(address, StandinHandler)
+        self.directory = directory
+        self.fixtures = fixtures or {}
+        self.latency = latency
+        self.error_rate = error_rate
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.stats = {"requests": 0, "ok": 0, "throttled": 0, "not_found": 0}
+
+    def admit(self):
+        with self.lock:
+            self.stats["requests"] += 1
+            if self.rate:
+                now = time.monotonic()
+                self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens < 1:
+                    self.stats["throttled"] += 1
+                    return False
+                self.tokens -= 1
+            if self.random.random() < self.error_rate:
+                self.stats["throttled"] += 1
+                return False
+            return True
+
+    def respond(self, path):
+        fixture = self.fixtures.get(path)
+        if fixture is not None:
+            return 200, fixture
+        return self.directory.route(path)
+
+
+class StandinHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def reply(self, status, body, headers=None):
+        data = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json;charset=UTF-8")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        if not self.path.startswith(API_PREFIX):
+            self.reply(404, {"developer-message": "Not found"})
+            return
+        if not self.server.admit():
+            self.reply(429, {"developer-message": "Too Many Requests"}, {"Retry-After": "1"})
+            return
+        if self.server.latency:
+            time.sleep(self.server.random.expovariate(1 / self.server.latency))
+        status, body = self.server.respond(unquote(self.path[len(API_PREFIX):]))
+        with self.server.lock:
+            self.server.stats["ok" if status == 200 else "not_found"] += 1
+        self.reply(status, body)
+
+
+def start_server(port=0, decoys=DEFAULT_DECOYS, **options):
+    """Starts a stand-in server in a background thread; returns ``(server, api_url)``."""
+    server = StandinServer(("127.0.0.1", port), Directory(decoys=decoys), load_fixtures(), **options)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/v3.0"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Offline stand-in for the ORCID public API.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--latency", type=float, default=0.0, help="mean seconds per request")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of random 429 responses")
+    parser.add_argument("--rate", type=float, default=None, help="requests/second before answering 429")
+    parser.add_argument("--burst", type=int, default=40)
+    parser.add_argument("--decoys", type=int, default=DEFAULT_DECOYS, help="homonym profiles per author name")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--fixtures", default=FIXTURES_PATH)
+    parser.add_argument("--record", action="store_true", help="record fixtures from the real API and exit")
+    args = parser.parse_args(argv)
+
+    if args.record:
+        record_responses(args.fixtures)
+        return
+
+    directory = Directory(decoys=args.decoys)
+    server = StandinServer(
+        (args.host, args.port),
+        directory,
+        load_fixtures(args.fixtures),
+        latency=args.latency,
+        error_rate=args.error_rate,
+        rate=args.rate,
+        burst=args.burst,
+        seed=args.seed,
+    )
+    print(f"ORCID stand-in serving {len(directory.profiles)} profiles at http://{args.host}:{args.port}/v3.0")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print(json.dumps(server.stats))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,16 @@
+import asyncio
+import argparse
 import json
 import os
+import random
+import time
+import unicodedata
 
-from rapidfuzz import fuzz
+import numpy as np
+from rapidfuzz import fuzz, process, utils
 import requests
 import re
+import threading
 
 def fetch_access_token(client_id, client_secret):
     resp = requests.post("https://orcid.org/oauth/token", data={
@@ -17,97 +24,261 @@ def fetch_access_token(client_id, client_secret):
 
 CLIENT_ID = "APP-4SOBDMAL2P672JW5"
 CLIENT_SECRET = "7b996b75-b456-4b1c-b4a9-54c53b142e12"
-ACCESS_TOKEN = fetch_access_token(CLIENT_ID, CLIENT_SECRET)
-HEADERS = {
-    "Accept": "application/json",
-    "Authorization": f"Bearer {ACCESS_TOKEN}"
-}
+HEADERS = {"Accept": "application/json"}
+
+# ORCID_API_URL points the client at another server (e.g. orcid_standin.py);
+# ORCID_ACCESS_TOKEN skips the OAuth request
+ORCID_API = os.environ.get("ORCID_API_URL", "https://pub.orcid.org/v3.0")
+_access_token = os.environ.get("ORCID_ACCESS_TOKEN")
+_token_lock = threading.Lock()
+
+
+def access_token():
+    """OAuth token for the public API, fetched on first use (not at import)."""
+    global _access_token
+    with _token_lock:
+        if _access_token is None:
+            _access_token = fetch_access_token(CLIENT_ID, CLIENT_SECRET)
+    return _access_token
+
+REQUEST_TIMEOUT = 30
+MAX_RETRIES = 5
+BACKOFF_BASE = 1.0
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# ORCID public API limits: 24 requests/second, bursts of up to 40
+ORCID_RATE = 24
+ORCID_BURST = 40
+ORCID_CONCURRENCY = 8
+
+# Candidate ranking
+SEARCH_ROWS = 50            # expanded-search results per author
+MATCH_SCORE = 60            # fuzzy score for a keyword match
+AFFILIATION_SCORE = 90      # token_set_ratio for an institution to count as the affiliation
+AMBIGUITY_MARGIN = 10       # affiliation lead needed to skip the works check
+TOP_CANDIDATES = 3          # candidates whose works are checked when ambiguous
+
+
+def retry_delay(attempt, resp=None):
+    """Seconds to wait before retry ``attempt``: ``Retry-After`` if given, else jittered backoff."""
+    retry_after = resp.headers.get("Retry-After", "") if resp is not None else ""
+    if retry_after.isdigit():
+        return float(retry_after)
+    return BACKOFF_BASE * 2 ** attempt * random.uniform(0.5, 1.5)
+
+
+def simplify_affiliation(summary):
+    org = summary.get("organization", {}) or {}
+    disambiguated = org.get("disambiguated-organization") or {}
+    start_date = summary.get("start-date") or {}
+    end_date = summary.get("end-date") or {}
+
+    return {
+        "institution": (org.get("name") or "").strip(),
+        "city": org.get("address", {}).get("city"),
+        "country": org.get("address", {}).get("country"),
+        "role": summary.get("role-title"),
+        "start_year": start_date.get("year", {}).get("value"),
+        "end_year": end_date.get("year", {}).get("value"),
+        "identifier": disambiguated.get("disambiguated-organization-identifier")
+    }
 
-def extract_affiliations(orcid_id):
-    base_url = f"https://pub.orcid.org/v3.0/{orcid_id}"
 
-    def fetch(endpoint):
+def extract_summaries(raw_data, summary_key):
+    results = []
+    for group in raw_data:
+        for s in group.get("summaries", []):
+            summary = s.get(summary_key)
+            if summary:
+                results.append(simplify_affiliation(summary))
+    return results
+
+
+class OrcidClient:
+    """Fetches the full ``/record`` of an ORCID iD once and derives everything from it.
+
+    A record holds the person section (external ids, URLs, other names) and the
+    activities summary (educations, employments, works), so one request per iD
+    replaces the separate ``educations``, ``employments``, ``person`` and
+    ``works`` calls. Successful records are memoized per iD. Without an
+    ``Authorization`` header the OAuth token is requested before the first call.
+    """
+
+    def __init__(self, headers=None, base_url=ORCID_API, timeout=REQUEST_TIMEOUT,
+                 max_retries=MAX_RETRIES, records=None):
+        self.base_url = base_url
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.session = requests.Session()
+        self.session.headers.update(HEADERS)
+        self.session.headers.update(headers or {})
+        self.records = {} if records is None else records
+        self.requests = 0
+
+    def get_once(self, path):
+        if "Authorization" not in self.session.headers:
+            self.session.headers["Authorization"] = f"Bearer {access_token()}"
+        self.requests += 1
+        return self.session.get(f"{self.base_url}/{path}", timeout=self.timeout)
+
+    def get(self, path):
+        """GET ``path``, retrying 429/5xx responses and connection errors with backoff."""
+        for attempt in range(self.max_retries + 1):
+            try:
+                resp = self.get_once(path)
+            except requests.RequestException:
+                if attempt == self.max_retries:
+                    raise
+                time.sleep(retry_delay(attempt))
+                continue
+            if resp.status_code not in RETRY_STATUSES or attempt == self.max_retries:
+                return resp
+            time.sleep(retry_delay(attempt, resp))
+
+    def record(self, orcid_id):
+        if orcid_id in self.records:
+            return self.records[orcid_id]
         try:
-            url = f"{base_url}/{endpoint}"
-            resp = requests.get(url, headers=HEADERS)
+            resp = self.get(f"{orcid_id}/record")
             if resp.status_code != 200:
-                return []
-            data = resp.json()
-            return data.get("affiliation-group", [])
+                return {}
+            self.records[orcid_id] = resp.json()
         except Exception as e:
-            print(f"Failed to fetch {endpoint} for {orcid_id}: {e}")
-            return []
+            print(f"Failed to fetch record for {orcid_id}: {e}")
+            return {}
+        return self.records[orcid_id]
 
-    def simplify(summary):
-        org = summary.get("organization", {}) or {}
-        disambiguated = org.get("disambiguated-organization") or {}
-        start_date = summary.get("start-date") or {}
-        end_date = summary.get("end-date") or {}
+    def activities(self, orcid_id):
+        return self.record(orcid_id).get("activities-summary") or {}
 
+    def affiliations(self, orcid_id):
+        activities = self.activities(orcid_id)
+        education_raw = (activities.get("educations") or {}).get("affiliation-group", [])
+        employment_raw = (activities.get("employments") or {}).get("affiliation-group", [])
         return {
-            "institution": (org.get("name") or "").strip(),
-            "city": org.get("address", {}).get("city"),
-            "country": org.get("address", {}).get("country"),
-            "role": summary.get("role-title"),
-            "start_year": start_date.get("year", {}).get("value"),
-            "end_year": end_date.get("year", {}).get("value"),
-            "identifier": disambiguated.get("disambiguated-organization-identifier")
+            "education": extract_summaries(education_raw, "education-summary"),
+            "employment": extract_summaries(employment_raw, "employment-summary"),
         }
 
+    def person_info(self, orcid_id):
+        person = self.record(orcid_id).get("person") or {}
+
+        # External IDs
+        ids = []
+        for ext_id in (person.get("external-identifiers") or {}).get("external-identifier", []):
+            ids.append({
+                "type": ext_id.get("external-id-type"),
+                "value": ext_id.get("external-id-value"),
+                "url": (ext_id.get("external-id-url") or {}).get("value")
+            })
+
+        # URLs
+        urls = []
+        for r_url in (person.get("researcher-urls") or {}).get("researcher-url", []):
+            urls.append({
+                "label": r_url.get("url-name"),
+                "url": (r_url.get("url") or {}).get("value")
+            })
+
+        # Other Names
+        other_names = [n.get("content") for n in (person.get("other-names") or {}).get("other-name", [])]
 
-    def extract_summaries(raw_data, summary_key):
-        results = []
-        for group in raw_data:
-            for s in group.get("summaries", []):
-                summary = s.get(summary_key)
-                if summary:
-                    results.append(simplify(summary))
-        return results
+        return {
+            "external_ids": ids,
+            "researcher_urls": urls,
+            "other_names": other_names
+        }
+
+    def works(self, orcid_id):
+        return (self.activities(orcid_id).get("works") or {}).get("group", [])
+
+    def work_count(self, orcid_id):
+        return len(self.works(orcid_id))
+
+
+class TokenBucket:
+    """Async token bucket: ``rate`` tokens per second, at most ``burst`` saved up."""
+
+    def __init__(self, rate=ORCID_RATE, burst=ORCID_BURST):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    async def take(self):
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class AsyncOrcidClient(OrcidClient):
+    """``OrcidClient`` for asyncio: requests go through a token bucket and a
+    connection pool of ``concurrency`` connections, blocking calls run in threads
+    and concurrent fetches of the same record are shared."""
+
+    def __init__(self, headers=None, concurrency=ORCID_CONCURRENCY, rate=ORCID_RATE,
+                 burst=ORCID_BURST, **kwargs):
+        super().__init__(headers, **kwargs)
+        adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=concurrency)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.bucket = TokenBucket(rate, burst)
+        self.slots = asyncio.Semaphore(concurrency)
+        self.pending = {}
+
+    async def get_async(self, path):
+        for attempt in range(self.max_retries + 1):
+            await self.bucket.take()
+            try:
+                async with self.slots:
+                    resp = await asyncio.to_thread(self.get_once, path)
+            except requests.RequestException:
+                if attempt == self.max_retries:
+                    raise
+                await asyncio.sleep(retry_delay(attempt))
+                continue
+            if resp.status_code not in RETRY_STATUSES or attempt == self.max_retries:
+                return resp
+            await asyncio.sleep(retry_delay(attempt, resp))
+
+    async def fetch_record(self, orcid_id):
+        try:
+            resp = await self.get_async(f"{orcid_id}/record")
+            if resp.status_code == 200:
+                self.records[orcid_id] = resp.json()
+        except Exception as e:
+            print(f"Failed to fetch record for {orcid_id}: {e}")
+        finally:
+            self.pending.pop(orcid_id, None)
 
-    # Fetch both education and employment summaries
-    education_raw = fetch("educations")
-    employment_raw = fetch("employments")
+    async def record_async(self, orcid_id):
+        if orcid_id not in self.records:
+            if orcid_id not in self.pending:
+                self.pending[orcid_id] = asyncio.ensure_future(self.fetch_record(orcid_id))
+            await asyncio.shield(self.pending[orcid_id])
+        return self.records.get(orcid_id, {})
 
-    education = extract_summaries(education_raw, "education-summary")
-    employment = extract_summaries(employment_raw, "employment-summary")
 
-    return {"education": education, "employment": employment}
+orcid_client = OrcidClient()
 
 
-def extract_person_info(orcid_id):
-    url = f"https://pub.orcid.org/v3.0/{orcid_id}/person"
-    resp = requests.get(url, headers=HEADERS).json()
-
-    # External IDs
-    ids = []
-    for ext_id in resp.get("external-identifiers", {}).get("external-identifier", []):
-        ids.append({
-            "type": ext_id.get("external-id-type"),
-            "value": ext_id.get("external-id-value"),
-            "url": ext_id.get("external-id-url", {}).get("value")
-        })
+def extract_affiliations(orcid_id):
+    return orcid_client.affiliations(orcid_id)
 
-    # URLs
-    urls = []
-    for r_url in resp.get("researcher-urls", {}).get("researcher-url", []):
-        urls.append({
-            "label": r_url.get("url-name"),
-            "url": r_url.get("url", {}).get("value")
-        })
 
-    # Other Names
-    other_names = [n.get("content") for n in resp.get("other-names", {}).get("other-name", [])]
+def extract_person_info(orcid_id):
+    return orcid_client.person_info(orcid_id)
 
-    return {
-        "external_ids": ids,
-        "researcher_urls": urls,
-        "other_names": other_names
-    }
 
 def count_works(orcid_id):
-    url = f"https://pub.orcid.org/v3.0/{orcid_id}/works"
-    resp = requests.get(url, headers=HEADERS).json()
-    return len(resp.get("group", []))
+    return orcid_client.work_count(orcid_id)
 
 
 def extract_keywords(title, min_length=5):
@@ -121,55 +292,159 @@ def work_matches_keywords(work_title, keywords, min_score=60):
     match_scores = [fuzz.partial_ratio(work_title.lower(), kw) for kw in keywords]
     return sum(score >= min_score for score in match_scores) >= max(1, len(keywords) // 2)
 
+def search_query(author_given, author_family):
+    query_parts = [f"family-name:{author_family}", f"given-names:{author_given}"]
+    return "+AND+".join(query_parts)
+
+
+def expanded_search_path(author_given, author_family):
+    return f"expanded-search/?q={search_query(author_given, author_family)}&rows={SEARCH_ROWS}"
+
+
+def rank_candidates(results, full_name, affiliation=None):
+    """Scores all ``expanded-search`` results at once; returns ``(orcid_id, affiliation_score)``
+    best first (affiliation score, then name similarity, then search order).
+
+    An institution only scores if it matches the affiliation at ``AFFILIATION_SCORE``
+    (``token_set_ratio``: its words, not just a substring, appear in the affiliation);
+    weaker overlaps such as a shared "University" are no evidence and score 0, so a
+    candidate without public institutions is not ranked below one with unrelated ones.
+    """
+    if not results:
+        return []
+    ids = [r["orcid-id"] for r in results]
+    names = [f"{r.get('given-names') or ''} {r.get('family-names') or ''}".lower() for r in results]
+    name_scores = process.cdist([full_name.lower()], names, scorer=fuzz.token_sort_ratio)[0]
+
+    aff_scores = np.zeros(len(results))
+    owners, institutions = [], []
+    for i, r in enumerate(results):
+        for inst in r.get("institution-name") or []:
+            owners.append(i)
+            institutions.append(inst.lower())
+    if affiliation and institutions:
+        scores = process.cdist(
+            [affiliation], institutions, scorer=fuzz.token_set_ratio,
+            processor=utils.default_process, score_cutoff=AFFILIATION_SCORE,
+        )[0]
+        np.maximum.at(aff_scores, owners, scores)
+
+    order = sorted(range(len(results)), key=lambda i: (-aff_scores[i], -name_scores[i], i))
+    return [(ids[i], float(aff_scores[i])) for i in order]
+
+
+def match_works(client, orcid_ids, title_keywords):
+    """Candidate of ``orcid_ids`` (records already fetched) with most works matching the
+    title keywords, with the rule of ``work_matches_keywords`` applied to all titles at once."""
+    owners, titles = [], []
+    for orcid_id in orcid_ids:
+        for group in client.works(orcid_id):
+            summary = group.get("work-summary", [])[0]
+            work_title = summary.get("title", {}).get("title", {}).get("value", "")
+            if work_title:
+                owners.append(orcid_id)
+                titles.append(work_title.lower())
+    if not titles or not title_keywords:
+        return None
+    scores = process.cdist(titles, title_keywords, scorer=fuzz.partial_ratio)
+    matches = (scores >= MATCH_SCORE).sum(axis=1) >= max(1, len(title_keywords) // 2)
+    counts = {orcid_id: 0 for orcid_id in orcid_ids}
+    for orcid_id, matched in zip(owners, matches):
+        counts[orcid_id] += bool(matched)
+    best = max(orcid_ids, key=lambda orcid_id: counts[orcid_id])
+    if counts[best]:
+        print(f"Matched via keywords: {best} | {counts[best]} works")
+        return best
+    return None
+
+
+def choose_candidate(ranked, affiliation=None):
+    """``(orcid_id, ids to check)``: a clear affiliation winner (or None), and the top
+    candidates whose works decide if the winner's own works do not confirm it."""
+    if not ranked:
+        return None, []
+    top_id, top_score = ranked[0]
+    runner_up = ranked[1][1] if len(ranked) > 1 else 0.0
+    to_check = [orcid_id for orcid_id, _ in ranked[:TOP_CANDIDATES]]
+    if affiliation and top_score >= AFFILIATION_SCORE and top_score - runner_up >= AMBIGUITY_MARGIN:
+        return top_id, to_check
+    return None, to_check
+
+
+def confirmed_by_works(client, orcid_id, title_keywords):
+    # the winner's record is fetched for its author fields anyway; works outrank
+    # affiliation, so a homonym at the same institution is only taken if its works
+    # match or (checked next) no candidate's works do
+    if not title_keywords or match_works(client, [orcid_id], title_keywords):
+        print(f"Matched via affiliation: {orcid_id}")
+        return True
+    return False
+
+
+def fallback_candidate(ranked, affiliation=None):
+    # works did not decide: keep the best affiliation match, if any
+    if affiliation and ranked and ranked[0][1] >= AFFILIATION_SCORE:
+        print(f"Matched via affiliation: {ranked[0][0]}")
+        return ranked[0][0]
+    return None
+
+
+def check_candidates(client, orcid_id, candidates):
+    # "no match" is only an answer if every candidate's works could be checked
+    missing = [c for c in candidates if c not in client.records]
+    if orcid_id is None and missing:
+        raise requests.RequestException(f"Could not fetch the records of {', '.join(missing)}")
+
+
 def get_orcid(author_given, author_family, paper_title, affiliation=None):
     print(f"Searching ORCID for: {author_given} {author_family}")
 
-    # Build search query
-    query_parts = [f"family-name:{author_family}", f"given-names:{author_given}"]
-    query = "+AND+".join(query_parts)
-    search_url = f"https://pub.orcid.org/v3.0/search?q={query}"
-    
-    response = requests.get(search_url, headers=HEADERS)
+    response = orcid_client.get(expanded_search_path(author_given, author_family))
     if response.status_code != 200:
-        print(f"Search failed: {response.status_code}")
-        return None
+        raise requests.HTTPError(f"Search failed: {response.status_code}", response=response)
 
-    results = response.json().get("result", [])
-    if not results:
+    results = response.json().get("expanded-result") or []
+    ranked = rank_candidates(results, f"{author_given} {author_family}", affiliation)
+    orcid_id, to_check = choose_candidate(ranked, affiliation)
+    title_keywords = extract_keywords(paper_title)
+    if orcid_id:
+        orcid_client.record(orcid_id)
+        if orcid_id in orcid_client.records and confirmed_by_works(orcid_client, orcid_id, title_keywords):
+            return orcid_id
+    if not to_check:
         return None
 
-    title_keywords = extract_keywords(paper_title)
+    for candidate in to_check:
+        orcid_client.record(candidate)
+    orcid_id = (match_works(orcid_client, to_check, title_keywords)
+                or fallback_candidate(ranked, affiliation))
+    check_candidates(orcid_client, orcid_id, to_check)
+    return orcid_id
 
-    for item in results:
-        orcid_id = item["orcid-identifier"]["path"]
-
-        # Check affiliation match first
-        if affiliation:
-            aff_data = extract_affiliations(orcid_id)
-            all_affiliations = [
-                a["institution"] for a in aff_data.get("education", []) + aff_data.get("employment", [])
-                if a.get("institution")
-            ]
-            if any(fuzz.partial_ratio(aff.lower(), affiliation.lower()) >= 60 for aff in all_affiliations):
-                print(f"Matched via affiliation: {orcid_id}")
-                return orcid_id
-
-        # If no affiliation or no match, try work title keywords
-        works_url = f"https://pub.orcid.org/v3.0/{orcid_id}/works"
-        works_resp = requests.get(works_url, headers=HEADERS)
-        if works_resp.status_code != 200:
-            continue
-
-        works = works_resp.json().get("group", [])
-        for group in works:
-            summary = group.get("work-summary", [])[0]
-            work_title = summary.get("title", {}).get("title", {}).get("value", "")
-            if work_title and work_matches_keywords(work_title, title_keywords):
-                print(f"Matched via keywords: {orcid_id} | Work: {work_title}")
-                return orcid_id
 
-    return None
+async def get_orcid_async(client, author_given, author_family, paper_title, affiliation=None):
+    print(f"Searching ORCID for: {author_given} {author_family}")
+
+    response = await client.get_async(expanded_search_path(author_given, author_family))
+    if response.status_code != 200:
+        raise requests.HTTPError(f"Search failed: {response.status_code}", response=response)
 
+    results = response.json().get("expanded-result") or []
+    ranked = rank_candidates(results, f"{author_given} {author_family}", affiliation)
+    orcid_id, to_check = choose_candidate(ranked, affiliation)
+    title_keywords = extract_keywords(paper_title)
+    if orcid_id:
+        await client.record_async(orcid_id)
+        if orcid_id in client.records and confirmed_by_works(client, orcid_id, title_keywords):
+            return orcid_id
+    if not to_check:
+        return None
+
+    await asyncio.gather(*(client.record_async(candidate) for candidate in to_check))
+    orcid_id = (match_works(client, to_check, title_keywords)
+                or fallback_candidate(ranked, affiliation))
+    check_candidates(client, orcid_id, to_check)
+    return orcid_id
 
 
 def split_name(full_name):
@@ -180,9 +455,10 @@ def split_name(full_name):
     family_name = " ".join(parts[1:])
     return given_name, family_name
 
-def enrich_author_info(full_name, paper_title, affiliation=None):
+def author_record(client, full_name, paper_title, orcid_id, failed=False):
+    """Author entry for ``orcid_id``; ``lookup_failed`` is set when the search
+    failed (``failed``) or the record of the iD could not be fetched."""
     given_name, family_name = split_name(full_name)
-    orcid_id = get_orcid(given_name, family_name, paper_title, affiliation)
 
     education = []
     employment = []
@@ -193,12 +469,16 @@ def enrich_author_info(full_name, paper_title, affiliation=None):
 
     if orcid_id is not None:
         print('id found')
-        education = extract_affiliations(orcid_id)['education']
-        employment = extract_affiliations(orcid_id)['employment']
-        external_ids = extract_person_info(orcid_id)['external_ids']
-        researcher_urls = extract_person_info(orcid_id)['researcher_urls']
-        other_names = extract_person_info(orcid_id)['other_names']
-        work_count = count_works(orcid_id)
+        # everything below comes from one memoized /record request
+        affiliations = client.affiliations(orcid_id)
+        person_info = client.person_info(orcid_id)
+        education = affiliations['education']
+        employment = affiliations['employment']
+        external_ids = person_info['external_ids']
+        researcher_urls = person_info['researcher_urls']
+        other_names = person_info['other_names']
+        work_count = client.work_count(orcid_id)
+        failed = failed or orcid_id not in client.records
 
     return {
         "full_name": full_name,
@@ -211,31 +491,200 @@ def enrich_author_info(full_name, paper_title, affiliation=None):
         "external_ids": external_ids,
         "researcher_urls": researcher_urls,
         "other_names": other_names,
-        "work_count": work_count
+        "work_count": work_count,
+        "lookup_failed": failed,
     }
 
+
+def enrich_author_info(full_name, paper_title, affiliation=None):
+    given_name, family_name = split_name(full_name)
+    try:
+        orcid_id = get_orcid(given_name, family_name, paper_title, affiliation)
+    except requests.RequestException as e:
+        print(f"ORCID lookup failed for {full_name}: {e}")
+        return author_record(orcid_client, full_name, paper_title, None, failed=True)
+    return author_record(orcid_client, full_name, paper_title, orcid_id)
+
+
+async def enrich_author_info_async(client, full_name, paper_title, affiliation=None):
+    given_name, family_name = split_name(full_name)
+    try:
+        orcid_id = await get_orcid_async(client, given_name, family_name, paper_title, affiliation)
+    except requests.RequestException as e:
+        print(f"ORCID lookup failed for {full_name}: {e}")
+        return author_record(client, full_name, paper_title, None, failed=True)
+    return author_record(client, full_name, paper_title, orcid_id)
+
+
+async def enrich_many_async(authors, concurrency=ORCID_CONCURRENCY):
+    """``enrich_author_info`` for ``(full_name, paper_title, affiliation)`` tuples, concurrently."""
+    client = AsyncOrcidClient(dict(orcid_client.session.headers), base_url=orcid_client.base_url,
+                              concurrency=concurrency, rate=ORCID_RATE, burst=ORCID_BURST,
+                              records=orcid_client.records)
+    try:
+        return await asyncio.gather(*(
+            enrich_author_info_async(client, name, title, affiliation)
+            for name, title, affiliation in authors
+        ))
+    finally:
+        orcid_client.requests += client.requests
+
+
+AUTHOR_CACHE_PATH = "outputs/orcid_author_cache.json"
+NEGATIVE_TTL = 7 * 24 * 3600  # seconds before an unresolved author is searched again
+PROFILE_FIELDS = ["orcid_id", "education", "employment", "external_ids", "researcher_urls",
+                  "other_names", "work_count"]
+
+
+def normalize_text(text):
+    text = unicodedata.normalize("NFKD", text or "")
+    text = "".join(c for c in text if not unicodedata.combining(c)).casefold()
+    return " ".join(re.sub(r"[^\w]+", " ", text).split())
+
+
+def author_key(full_name, affiliation=None):
+    return f"{normalize_text(full_name)}|{normalize_text(affiliation)}"
+
+
+class AuthorCache:
+    """Persistent author resolution keyed by normalized name and affiliation.
+
+    Each entry keeps the resolved ORCID iD with the profile derived from its
+    record, and the titles of the papers the author was seen on. Unresolved
+    authors are cached too, but searched again after ``NEGATIVE_TTL``. Lookups
+    that failed (search or record request) are not cached at all.
+    """
+
+    def __init__(self, path=AUTHOR_CACHE_PATH, negative_ttl=NEGATIVE_TTL):
+        self.path = path
+        self.negative_ttl = negative_ttl
+        self.entries = {}
+        if path and os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                self.entries = json.load(f)
+
+    def get(self, key):
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        if entry["profile"]["orcid_id"] is None and time.time() - entry["resolved_at"] > self.negative_ttl:
+            return None
+        return entry
+
+    def put(self, key, profile, paper_titles):
+        self.entries[key] = {"profile": profile, "papers": [], "resolved_at": time.time()}
+        self.add_evidence(key, paper_titles)
+
+    def add_evidence(self, key, paper_titles):
+        papers = self.entries[key]["papers"]
+        papers.extend(t for t in paper_titles if t and t not in papers)
+
+    def save(self):
+        if not self.path:
+            return
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.entries, f, indent=2, ensure_ascii=False)
+        os.replace(tmp, self.path)
+
+
+def enrich_authors(papers, cache=None, concurrency=1):
+    """Enriches every author occurrence of ``papers``, one ORCID lookup per distinct author.
+
+    Occurrences are first grouped by ``author_key`` (before any network I/O);
+    each group is answered from ``cache`` or resolved once with the title of
+    its first paper, and every occurrence gets its own record. With
+    ``concurrency`` > 1 the lookups run concurrently (``enrich_many_async``).
+    """
+    occurrences = []
+    groups = {}
+    for paper in papers:
+        paper_title = paper.get("title", "")
+        for author_obj in paper.get("authors", []):
+            author_name = author_obj.get("name")
+            raw_affiliation = author_obj.get("affiliation", "")
+            cleaned_affiliation = " ".join(raw_affiliation.split()) if raw_affiliation else None
+            key = author_key(author_name, cleaned_affiliation)
+            occurrences.append((key, author_name, paper_title))
+            groups.setdefault(key, (author_name, cleaned_affiliation, []))[2].append(paper_title)
+
+    print(f"{len(occurrences)} author occurrences, {len(groups)} distinct authors")
+    profiles = {}
+    todo = []
+    for key, (author_name, affiliation, titles) in groups.items():
+        entry = cache.get(key) if cache is not None else None
+        if entry is not None:
+            cache.add_evidence(key, titles)
+            profiles[key] = entry["profile"]
+        else:
+            todo.append(key)
+
+    failed = []
+
+    def resolved(key, info):
+        # cached as soon as it is known, so an interrupted run keeps it
+        profiles[key] = {field: info[field] for field in PROFILE_FIELDS}
+        if info["lookup_failed"]:
+            failed.append(key)
+        elif cache is not None:
+            cache.put(key, profiles[key], groups[key][2])
+
+    if concurrency > 1:
+        authors = [(groups[key][0], groups[key][2][0], groups[key][1]) for key in todo]
+        for key, info in zip(todo, asyncio.run(enrich_many_async(authors, concurrency))):
+            resolved(key, info)
+    else:
+        for key in todo:
+            author_name, affiliation, titles = groups[key]
+            print(affiliation)
+            resolved(key, enrich_author_info(author_name, titles[0], affiliation))
+    if failed:
+        print(f"{len(failed)} ORCID lookups failed (not cached, retried next run)")
+
+    enriched = []
+    for key, author_name, paper_title in occurrences:
+        given_name, family_name = split_name(author_name)
+        profile = profiles[key]
+        enriched.append({
+            "full_name": author_name,
+            "family_name": family_name,
+            "given_name": given_name,
+            "orcid_id": profile["orcid_id"],
+            "paper_cited": paper_title,
+            **{field: profile[field] for field in PROFILE_FIELDS[1:]},
+        })
+    return enriched
+
+
 # Load the original JSON
 INPUT_PATH = "outputs/papers_metadata.json"
 OUTPUT_PATH = "outputs/enriched_authors.json"
 
-with open(INPUT_PATH, "r", encoding="utf-8") as f:
-    papers = json.load(f)
 
-enriched_data = []
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Enrich paper authors with ORCID data.")
+    parser.add_argument("--concurrency", type=int, default=int(os.environ.get("ORCID_CONCURRENCY", 1)),
+                        help="authors looked up at once (1 = one after another)")
+    args = parser.parse_args(argv)
+
+    with open(INPUT_PATH, "r", encoding="utf-8") as f:
+        papers = json.load(f)
+
+    start = time.perf_counter()
+    author_cache = AuthorCache()
+    try:
+        enriched_data = enrich_authors(papers, author_cache, args.concurrency)
+    finally:
+        author_cache.save()  # keeps the authors resolved so far if the run fails
+    print(f"{len(enriched_data)} authors in {time.perf_counter() - start:.1f}s, "
+          f"{orcid_client.requests} ORCID requests")
 
-for paper in papers:
-    paper_title = paper.get("title", "")
+    # Save to new JSON
+    with open(OUTPUT_PATH, "w", encoding="utf-8") as f:
+        json.dump(enriched_data, f, indent=2, ensure_ascii=False)
 
-    for author_obj in paper.get("authors", []):
-        author_name = author_obj.get("name")
-        raw_affiliation = author_obj.get("affiliation", "")
-        cleaned_affiliation = " ".join(raw_affiliation.split()) if raw_affiliation else None
-        print(cleaned_affiliation)
-        enriched_info = enrich_author_info(author_name, paper_title, cleaned_affiliation)
-        enriched_data.append(enriched_info)
+    print(f"Enriched author data saved to {OUTPUT_PATH}")
 
-# Save to new JSON
-with open(OUTPUT_PATH, "w", encoding="utf-8") as f:
-    json.dump(enriched_data, f, indent=2, ensure_ascii=False)
 
-print(f"Enriched author data saved to {OUTPUT_PATH}")
+if __name__ == "__main__":
+    main()
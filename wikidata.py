@@ -6,14 +6,27 @@ enrich_wikidata_v1.1.py
 • Añade enriched_organizations  / enriched_projects
   con TODOS los campos del modelo (null si no hay dato)
 • Guarda outputs/papers_metadata_wikidata.json
+• Si existe el índice local (wikidata_index.py) no usa la red
+• Modo por lotes (por defecto): búsquedas concurrentes y entidades con
+  `wbgetentities` de 50 en 50, solo claims + etiqueta inglesa
+  (`--per-name` vuelve a una búsqueda + EntityData completo por nombre)
+• Segundo salto: los QIDs de país / financiador / fundador se resuelven a
+  etiqueta (y código ISO del país) en lote, con caché SQLite persistente;
+  se guardan junto al QID (`has_funder_label`, `has_located_country_iso` …)
+• Modo incremental (`--delta`): los registros enriquecidos se guardan en la
+  caché SQLite; solo se consultan los nombres nuevos o caducados
+  (`--max-age`) y solo se rehacen los artículos afectados
 """
 
 from __future__ import annotations
-import json, requests, time
+import argparse, json, requests, sqlite3, time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import Dict, Any
 from tqdm import tqdm
 
+from wikidata_index import open_index
+
 # -------------------------------------------------------------------------
 ROOT      = Path(__file__).resolve().parent
 IN_FILE   = ROOT / "outputs/papers_metadata_ner.json"
@@ -22,37 +35,193 @@ OUT_FILE  = ROOT / "outputs/papers_metadata_wikidata.json"
 SEARCH    = "https://www.wikidata.org/w/api.php"
 ENTITY    = "https://www.wikidata.org/wiki/Special:EntityData/{}.json"
 HEADERS   = {"User-Agent": "KG-Enricher/1.1 (contact@example.com)"}
+BATCH       = 50                          # ids por llamada wbgetentities
+CONCURRENCY = 8                           # peticiones simultáneas
+
+CACHE_DB    = ROOT / "outputs/wikidata_cache.sqlite"
+LABEL_TTL   = 30*24*3600                  # s · etiquetas de QIDs referenciados
+REF_PROPS   = ["has_located_country","has_funder","has_founder"]   # campos con QID
+ENRICH_MAX_AGE = 30                       # días · registros enriquecidos (--delta)
+FIELDS      = {"org":"enriched_organizations","proj":"enriched_projects"}
+NAME_KEY    = {"org":"has_name_organization","proj":"has_id_project"}
 
 ORG_QIDS  = {"Q43229","Q3918","Q783794","Q79913","Q31855"}
 PROJ_QIDS = {"Q23044590","Q3402703","Q722377"}
 
+FAILED    = object()                      # fallo transitorio (red): ni se cachea ni se guarda
+
 # -------------------------------------------------------------------------
 _cache_search: dict[str,str|None] = {}
 _cache_entity: dict[str,dict]|None = {}
+_index = open_index()                     # índice local (wikidata_index.py)
 
 def search_exact(label:str)->str|None:
+    """QID si hay una única coincidencia exacta, None si no, FAILED si falla la red"""
     if label in _cache_search:            # caché
         return _cache_search[label]
+    if _index is not None:                # índice local, sin red
+        qids=_index.search_exact(label)
+        _cache_search[label]=qids[0] if len(qids)==1 else None
+        return _cache_search[label]
     params={"action":"wbsearchentities","search":label,"language":"en",
             "type":"item","format":"json","limit":5}
     try:
-        hits=[h for h in requests.get(SEARCH,params=params,headers=HEADERS,
-                                       timeout=8).json().get("search",[])
+        r=requests.get(SEARCH,params=params,headers=HEADERS,timeout=8)
+        r.raise_for_status()
+        hits=[h for h in r.json()["search"]   # sin "search" (error de la API) → fallo
               if h["label"].casefold()==label.casefold()]
         qid = hits[0]["id"] if len(hits)==1 else None
-    except Exception: qid=None
+    except Exception: return FAILED
     _cache_search[label]=qid
     return qid
 
 def fetch_entity(qid:str)->dict|None:
     if qid in _cache_entity:              # caché
         return _cache_entity[qid]
+    if _index is not None:                # índice local, sin red
+        _cache_entity[qid]=_index.entity(qid)
+        return _cache_entity[qid]
     try:
-        data=requests.get(ENTITY.format(qid),headers=HEADERS,timeout=8).json()
-        _cache_entity[qid]=data["entities"][qid]
-    except Exception: _cache_entity[qid]=None
+        r=requests.get(ENTITY.format(qid),headers=HEADERS,timeout=8)
+        if r.status_code==404:            # QID inexistente
+            _cache_entity[qid]=None
+            return None
+        _cache_entity[qid]=r.json()["entities"][qid]
+    except Exception: return FAILED
     return _cache_entity[qid]
 
+# ----------   modo por lotes  --------------------------------------------
+_session = requests.Session()
+_session.headers.update(HEADERS)
+
+def search_many(labels)->dict[str,str|None]:
+    """search_exact de todas las etiquetas, con CONCURRENCY peticiones a la vez"""
+    labels=list(dict.fromkeys(labels))
+    with ThreadPoolExecutor(CONCURRENCY) as ex:
+        return dict(zip(labels, ex.map(search_exact, labels)))
+
+def _get_entities(qids:list[str])->dict[str,dict|None]:
+    params={"action":"wbgetentities","ids":"|".join(qids),"props":"labels|claims",
+            "languages":"en","format":"json"}
+    try:
+        ents=_session.get(SEARCH,params=params,timeout=30).json()["entities"]
+    except Exception: return {q:FAILED for q in qids}
+    return {q:ents.get(q) if "missing" not in ents.get(q,{}) else None for q in qids}
+
+def fetch_entities(qids)->dict[str,dict|None]:
+    """fetch_entity de muchos QIDs: wbgetentities de BATCH en BATCH (concurrentes)"""
+    qids=list(dict.fromkeys(q for q in qids if q and q is not FAILED))
+    todo=[q for q in qids if q not in _cache_entity]
+    out={}
+    if _index is not None:
+        _cache_entity.update({q:_index.entity(q) for q in todo})
+    elif todo:
+        batches=[todo[i:i+BATCH] for i in range(0,len(todo),BATCH)]
+        with ThreadPoolExecutor(CONCURRENCY) as ex:
+            for ents in ex.map(_get_entities, batches):
+                _cache_entity.update({q:e for q,e in ents.items() if e is not FAILED})
+                out.update(ents)
+    return {q:_cache_entity.get(q,out.get(q)) for q in qids}
+
+# ----------   segundo salto: etiquetas de QIDs referenciados  -------------
+class QidLabelCache:
+    """QID → (etiqueta inglesa, ISO 3166‑1 alpha‑2) en SQLite, con TTL"""
+    def __init__(self,path:Path=CACHE_DB,ttl:float=LABEL_TTL):
+        path.parent.mkdir(parents=True,exist_ok=True)
+        self.conn=sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS qid_labels "
+                          "(qid TEXT PRIMARY KEY, label TEXT, iso TEXT, fetched REAL NOT NULL)")
+        self.ttl=ttl
+    def get_many(self,qids)->dict[str,tuple]:
+        out,qids={},list(qids)
+        for i in range(0,len(qids),500):
+            chunk=qids[i:i+500]
+            rows=self.conn.execute(
+                f"SELECT qid,label,iso FROM qid_labels WHERE fetched>? AND qid IN ({','.join('?'*len(chunk))})",
+                [time.time()-self.ttl,*chunk]).fetchall()
+            out.update({q:(l,iso) for q,l,iso in rows})
+        return out
+    def put_many(self,rows:dict[str,tuple]):
+        now=time.time()
+        self.conn.executemany("INSERT OR REPLACE INTO qid_labels VALUES (?,?,?,?)",
+                              [(q,l,iso,now) for q,(l,iso) in rows.items()])
+        self.conn.commit()
+
+class EnrichmentStore:
+    """(tipo, nombre) → registro enriquecido + fecha, para el modo --delta"""
+    def __init__(self,path:Path=CACHE_DB):
+        path.parent.mkdir(parents=True,exist_ok=True)
+        self.conn=sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS enriched (kind TEXT NOT NULL, name TEXT NOT NULL, "
+                          "record TEXT NOT NULL, fetched REAL NOT NULL, PRIMARY KEY (kind, name))")
+    def __len__(self)->int:
+        return self.conn.execute("SELECT COUNT(*) FROM enriched").fetchone()[0]
+    def get_all(self,kind:str)->dict[str,tuple]:
+        rows=self.conn.execute("SELECT name,record,fetched FROM enriched WHERE kind=?",(kind,))
+        return {n:(json.loads(r),f) for n,r,f in rows}
+    def put_many(self,kind:str,records:dict[str,dict],fetched:float|None=None):
+        now=fetched or time.time()
+        self.conn.executemany("INSERT OR REPLACE INTO enriched VALUES (?,?,?,?)",
+            [(kind,n,json.dumps(r,ensure_ascii=False),now) for n,r in records.items()])
+        self.conn.commit()
+    def seed(self,papers:list[dict],fetched:float):
+        """importa los registros de una salida anterior (papers_metadata_wikidata.json)"""
+        for kind,field in FIELDS.items():
+            self.put_many(kind,{r[NAME_KEY[kind]]:r for p in papers for r in p.get(field,[])},fetched)
+
+def _label_iso(ent:dict)->tuple:
+    iso=first(ent.get("claims",{}),"P297")
+    return ent.get("labels",{}).get("en",{}).get("value"), iso
+
+def _get_labels(args)->dict[str,tuple]:
+    qids,props=args
+    params={"action":"wbgetentities","ids":"|".join(qids),"props":props,
+            "languages":"en","format":"json"}
+    try:
+        ents=_session.get(SEARCH,params=params,timeout=30).json()["entities"]
+    except Exception: return {}           # fallo transitorio → sin cachear
+    return {q:_label_iso(e) for q,e in ents.items() if q in qids}
+
+def resolve_qids(qids,countries=())->dict[str,tuple]:
+    """(etiqueta, ISO) de cada QID: caché → índice local → wbgetentities.
+    Una sola ronda de llamadas de BATCH en BATCH, concurrentes: solo
+    etiquetas, salvo los países, que piden también claims (P297)"""
+    qids=set(qids); countries=set(countries)&qids
+    cache=QidLabelCache(CACHE_DB)
+    out=cache.get_many(qids)
+    found={}
+    if _index is not None:
+        for q in qids-out.keys():
+            ent=_index.entity(q)
+            if ent: found[q]=_label_iso(ent)
+    todo=qids-out.keys()-found.keys()
+    jobs=[]
+    for group,props in ((sorted(todo-countries),"labels"),(sorted(todo&countries),"labels|claims")):
+        jobs+=[(group[i:i+BATCH],props) for i in range(0,len(group),BATCH)]
+    with ThreadPoolExecutor(CONCURRENCY) as ex:
+        for res in ex.map(_get_labels,jobs):
+            found.update(res)
+    cache.put_many(found)
+    return {**out,**found}
+
+def attach_labels(records)->int:
+    """Añade `<campo>_label` (y `has_located_country_iso`) a los registros
+    enriquecidos; devuelve cuántos QIDs distintos se resolvieron"""
+    records=list(records)
+    qids={r[f] for r in records for f in REF_PROPS if r.get(f)}
+    countries={r["has_located_country"] for r in records if r.get("has_located_country")}
+    res=resolve_qids(qids,countries)
+    for r in records:
+        for f in REF_PROPS:
+            if f in r:
+                r[f+"_label"]=res.get(r[f],(None,None))[0] if r[f] else None
+        if "has_located_country" in r:
+            q=r["has_located_country"]
+            r["has_located_country_iso"]=res.get(q,(None,None))[1] if q else None
+    return len(res)
+
 def first(claims,pid):                    # helper
     v=claims.get(pid)
     if not v: return None
@@ -72,35 +241,48 @@ ORG_TEMPLATE = {
     "has_wikidata_uri": None,
     "has_wikidata_label": None,
     "has_located_country": None,
+    "has_located_country_label": None,
+    "has_located_country_iso": None,
     "has_website": None,
     "has_start_date": None,
     "has_end_date": None,
     "has_funder": None,
+    "has_funder_label": None,
     "has_founder": None,
+    "has_founder_label": None,
 }
 PROJ_TEMPLATE = {
     "has_id_project": None,
     "has_wikidata_uri": None,
     "has_wikidata_label": None,
     "has_located_country": None,
+    "has_located_country_label": None,
+    "has_located_country_iso": None,
     "has_website": None,
     "has_start_date": None,
     "has_end_date": None,
     "has_funder": None,
+    "has_funder_label": None,
 }
 
-def enrich(name:str,kind:str)->Dict[str,Any]:
-    """kind=='org'|'proj'  → devuelve dict completo (nulls si vacío)"""
+def enrich(name:str,kind:str)->Dict[str,Any]|None:
+    """kind=='org'|'proj'  → devuelve dict completo (nulls si vacío);
+    None si la red falla (no es lo mismo que «sin coincidencia»)"""
     base=ORG_TEMPLATE.copy() if kind=="org" else PROJ_TEMPLATE.copy()
     key  ="has_name_organization" if kind=="org" else "has_id_project"
     base[key]=name                         # siempre guardamos el nombre
 
     qid = search_exact(name)
+    if qid is FAILED: return None
     if not qid:                            # sin coincidencia → todos null
         return base
-
     ent = fetch_entity(qid)
-    if not ent:                            # error al descargar
+    if ent is FAILED: return None
+    return build(base, kind, qid, ent)
+
+def build(base:Dict[str,Any],kind:str,qid:str|None,ent:dict|None)->Dict[str,Any]:
+    """rellena la plantilla `base` con la entidad `ent` (si es del tipo esperado)"""
+    if not qid or not ent:                 # sin coincidencia / error al descargar
         return base
 
     # verificar instancia
@@ -125,23 +307,100 @@ def enrich(name:str,kind:str)->Dict[str,Any]:
         base["has_founder"]= first(claims,"P112")
     return base
 
+def enrich_bulk(names:dict[str,set[str]])->dict[str,dict[str,Dict[str,Any]|None]]:
+    """enrich de todos los nombres (`{"org": {...}, "proj": {...}}`) por lotes:
+    búsquedas concurrentes + wbgetentities de 50 en 50 (None si falla la red)"""
+    qid_of=search_many(n for ns in names.values() for n in sorted(ns))
+    ents=fetch_entities(qid_of.values())
+    out={}
+    for kind,ns in names.items():
+        key="has_name_organization" if kind=="org" else "has_id_project"
+        tmpl=ORG_TEMPLATE if kind=="org" else PROJ_TEMPLATE
+        out[kind]={n:None if FAILED in (qid_of[n],ents.get(qid_of[n]))
+                   else build({**tmpl,key:n},kind,qid_of[n],ents.get(qid_of[n])) for n in ns}
+    return out
+
 # -------------------------------------------------------------------------
-print("📑 Leyendo papers_metadata_ner.json …")
-papers=json.loads(IN_FILE.read_text("utf-8"))
+def main(argv=None):
+    ap=argparse.ArgumentParser(description="Enriquece orgs / proyectos con Wikidata.")
+    ap.add_argument("--per-name",action="store_true",
+                    help="una búsqueda + EntityData completo por nombre (modo antiguo)")
+    ap.add_argument("--delta",action="store_true",
+                    help="solo nombres nuevos o caducados; reutiliza la salida / caché anterior")
+    ap.add_argument("--max-age",type=float,default=ENRICH_MAX_AGE,
+                    help="días tras los que un registro enriquecido se vuelve a consultar")
+    args=ap.parse_args(argv)
+
+    print("📑 Leyendo papers_metadata_ner.json …")
+    papers=json.loads(IN_FILE.read_text("utf-8"))
+
+    names={"org" :{o for p in papers for o in p.get("organizations",[])},
+           "proj":{g for p in papers for g in p.get("projects",[])}}
+
+    print(f"· Organizaciones únicas: {len(names['org'])}")
+    print(f"· Proyectos únicos     : {len(names['proj'])}\n")
+
+    store=EnrichmentStore(CACHE_DB)
+    previous,known,stored=[],{"org":{},"proj":{}},{"org":{},"proj":{}}
+    if args.delta:
+        if OUT_FILE.exists():
+            previous=json.loads(OUT_FILE.read_text("utf-8"))
+            if not len(store):
+                store.seed(previous,OUT_FILE.stat().st_mtime)
+        limit=time.time()-args.max_age*24*3600
+        for kind in names:
+            tmpl=ORG_TEMPLATE if kind=="org" else PROJ_TEMPLATE
+            stored[kind]={n:(r,f) for n,(r,f) in store.get_all(kind).items()
+                          if n in names[kind] and tmpl.keys()<=r.keys()}
+            known[kind]={n:r for n,(r,f) in stored[kind].items() if f>=limit}
+    todo={kind:ns-known[kind].keys() for kind,ns in names.items()}
+    if args.delta:
+        print(f"· Por enriquecer (nuevos / caducados): {len(todo['org'])} orgs, {len(todo['proj'])} proyectos")
 
-org_names={o for p in papers for o in p.get("organizations",[])}
-proj_names={g for p in papers for g in p.get("projects",[])}
+    if args.per_name:
+        fresh={"org" :{n:enrich(n,"org")  for n in tqdm(todo["org"], desc="orgs     ")},
+               "proj":{n:enrich(n,"proj") for n in tqdm(todo["proj"],desc="projects")}}
+    else:
+        t0=time.time()
+        fresh=enrich_bulk(todo)
+        print(f"· Enriquecidos por lotes en {time.time()-t0:.1f}s")
 
-print(f"· Organizaciones únicas: {len(org_names)}")
-print(f"· Proyectos únicos     : {len(proj_names)}\n")
+    # fallos de red: se conserva el registro guardado (aunque esté caducado)
+    # o, si no hay, la plantilla vacía; no se guardan y se reintentan la próxima vez
+    failed={kind:{n for n,r in records.items() if r is None} for kind,records in fresh.items()}
+    fresh={kind:{n:r for n,r in records.items() if r is not None} for kind,records in fresh.items()}
+    if any(failed.values()):
+        print(f"⚠️  Fallos de red: {len(failed['org'])} orgs, {len(failed['proj'])} proyectos "
+              "(se mantiene el registro anterior)")
+    n=attach_labels([*fresh["org"].values(),*fresh["proj"].values()])
+    print(f"· Etiquetas de {n} QIDs referenciados (país / financiador / fundador)")
+    for kind,records in fresh.items():
+        store.put_many(kind,records)
+    table={}
+    for kind in names:
+        key="has_name_organization" if kind=="org" else "has_id_project"
+        tmpl=ORG_TEMPLATE if kind=="org" else PROJ_TEMPLATE
+        kept={n:stored[kind][n][0] if n in stored[kind] else {**tmpl,key:n} for n in failed[kind]}
+        table[kind]={**kept,**known[kind],**fresh[kind]}
 
-enriched_orgs  ={n:enrich(n,"org")  for n in tqdm(org_names, desc="orgs     ")}
-enriched_projs ={n:enrich(n,"proj") for n in tqdm(proj_names,desc="projects")}
+    # en --delta, los artículos sin cambios ni nombres nuevos se copian tal cual
+    prev_by_file={p.get("filename"):p for p in previous}
+    updated=0
+    for p in papers:
+        old=prev_by_file.get(p.get("filename"))
+        if old is not None and {k:v for k,v in old.items() if k not in FIELDS.values()}==p \
+           and not (set(p.get("organizations",[]))&todo["org"] or set(p.get("projects",[]))&todo["proj"]):
+            p.update({f:old[f] for f in FIELDS.values() if f in old})
+            continue
+        p["enriched_organizations"]=[table["org"][n]  for n in p.get("organizations",[])]
+        p["enriched_projects"]     =[table["proj"][n] for n in p.get("projects",[])]
+        updated+=1
+    if args.delta:
+        print(f"· Artículos actualizados: {updated} (sin cambios: {len(papers)-updated})")
 
-for p in papers:
-    p["enriched_organizations"]=[enriched_orgs[n]  for n in p.get("organizations",[])]
-    p["enriched_projects"]     =[enriched_projs[n] for n in p.get("projects",[])]
+    OUT_FILE.parent.mkdir(exist_ok=True)
+    OUT_FILE.write_text(json.dumps(papers,indent=2,ensure_ascii=False),"utf-8")
+    print(f"\n✅  Guardado → {OUT_FILE.relative_to(ROOT)}")
 
-OUT_FILE.parent.mkdir(exist_ok=True)
-OUT_FILE.write_text(json.dumps(papers,indent=2,ensure_ascii=False),"utf-8")
-print(f"\n✅  Guardado → {OUT_FILE.relative_to(ROOT)}")
+if __name__ == "__main__":
+    main()
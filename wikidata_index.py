@@ -0,0 +1,196 @@
+# -*- coding: utf-8 -*-
+"""Índice local de Wikidata (SQLite) construido desde un dump JSON.
+
+`ner.py` y `wikidata.py` solo necesitan una porción mínima de Wikidata:
+etiquetas/alias en inglés, `P31` y unas pocas propiedades de organizaciones y
+proyectos. Este script recorre el dump una sola vez (en streaming, también
+comprimido `.gz` / `.bz2`) y guarda:
+
+• `labels(key, qid, alias)`  → etiqueta/alias *casefold* → QID
+• `entities(qid, label, claims)` → etiqueta inglesa y claims reducidos
+
+Con el índice presente (`outputs/wikidata_index.sqlite` o la variable
+`WIKIDATA_INDEX`), `classify_wikidata`, `search_exact` y `fetch_entity`
+responden desde disco, sin red ni límites de ritmo.
+
+Como el camino de la API (`wbsearchentities` filtrado por etiqueta exacta),
+la búsqueda solo compara la etiqueta inglesa, no los alias. Diferencia que
+queda: el índice solo tiene entidades de `KEEP_TYPES`, así que una etiqueta
+que en Wikidata comparten, p. ej., una persona y una universidad aquí solo
+encuentra la universidad (la API devuelve ambas, hasta 5, y puede quedarse
+con la persona o declararla ambigua).
+
+```bash
+# dump completo o pre‑filtrado: https://dumps.wikimedia.org/wikidatawiki/entities/
+python wikidata_index.py latest-all.json.gz
+```
+"""
+from __future__ import annotations
+
+import argparse
+import bz2
+import gzip
+import json
+import os
+import sqlite3
+import time
+from pathlib import Path
+from typing import Dict, Iterator, List
+
+ROOT       = Path(__file__).resolve().parent
+INDEX_FILE = ROOT / "outputs/wikidata_index.sqlite"
+
+# Tipos (P31) que se conservan: los de ner.py / wikidata.py + países (P17)
+KEEP_TYPES = {
+    "Q43229", "Q3918", "Q783794", "Q79913", "Q31855",   # organizaciones
+    "Q23044590", "Q722377", "Q3402703",                 # proyectos / programas
+    "Q6256", "Q3624078",                                # país / estado soberano
+}
+KEEP_PROPS = ["P31", "P17", "P856", "P571", "P580", "P582", "P859", "P112", "P297"]
+
+###############################################################################
+# CONSTRUCCIÓN                                                               #
+###############################################################################
+
+def _open(path: Path):
+    if path.suffix == ".gz":
+        return gzip.open(path, "rt", encoding="utf-8")
+    if path.suffix == ".bz2":
+        return bz2.open(path, "rt", encoding="utf-8")
+    return open(path, "r", encoding="utf-8")
+
+def iter_entities(dump: Path, keep_types: set[str] = KEEP_TYPES) -> Iterator[dict]:
+    """Entidades del dump (una por línea) cuyo `P31` está en `keep_types`."""
+    needles = [f'"{q}"' for q in keep_types]
+    with _open(dump) as f:
+        for line in f:
+            line = line.strip().rstrip(",")
+            # descarte rápido antes de parsear el JSON
+            if not line.startswith("{") or '"P31"' not in line or not any(n in line for n in needles):
+                continue
+            ent = json.loads(line)
+            p31 = {
+                c["mainsnak"]["datavalue"]["value"]["id"]
+                for c in ent.get("claims", {}).get("P31", [])
+                if "datavalue" in c["mainsnak"]
+            }
+            if p31 & keep_types:
+                yield ent
+
+def compact_claims(claims: dict) -> Dict[str, list]:
+    """Claims reducidos a `KEEP_PROPS`, con la misma forma `mainsnak` que la API."""
+    out = {}
+    for pid in KEEP_PROPS:
+        snaks = [
+            {"mainsnak": {"datatype": c["mainsnak"].get("datatype"),
+                          "datavalue": {"value": c["mainsnak"]["datavalue"]["value"]}}}
+            for c in claims.get(pid, [])
+            if "datavalue" in c["mainsnak"]
+        ]
+        if snaks:
+            out[pid] = snaks
+    return out
+
+def build_index(dump: Path, out: Path = INDEX_FILE, batch: int = 10_000) -> int:
+    """Construye el índice SQLite desde `dump`; devuelve el número de entidades."""
+    out.parent.mkdir(parents=True, exist_ok=True)
+    tmp = out.with_suffix(".tmp")
+    if tmp.exists():
+        tmp.unlink()
+    conn = sqlite3.connect(tmp)
+    conn.executescript("""
+        PRAGMA journal_mode = OFF;
+        PRAGMA synchronous = OFF;
+        CREATE TABLE entities (qid TEXT PRIMARY KEY, label TEXT, claims TEXT NOT NULL);
+        CREATE TABLE labels (key TEXT NOT NULL, qid TEXT NOT NULL, alias INTEGER NOT NULL);
+    """)
+    n, ents, labels = 0, [], []
+    t0 = time.time()
+    for ent in iter_entities(dump):
+        qid = ent["id"]
+        label = ent.get("labels", {}).get("en", {}).get("value")
+        ents.append((qid, label, json.dumps(compact_claims(ent.get("claims", {})))))
+        if label:
+            labels.append((label.casefold(), qid, 0))
+        for alias in ent.get("aliases", {}).get("en", []):
+            labels.append((alias["value"].casefold(), qid, 1))
+        n += 1
+        if len(ents) >= batch:
+            conn.executemany("INSERT OR REPLACE INTO entities VALUES (?, ?, ?)", ents)
+            conn.executemany("INSERT INTO labels VALUES (?, ?, ?)", labels)
+            ents, labels = [], []
+            print(f"\r· {n:,} entidades ({time.time() - t0:.0f}s)", end="", flush=True)
+    conn.executemany("INSERT OR REPLACE INTO entities VALUES (?, ?, ?)", ents)
+    conn.executemany("INSERT INTO labels VALUES (?, ?, ?)", labels)
+    conn.execute("CREATE INDEX labels_key ON labels (key)")
+    conn.commit()
+    conn.close()
+    os.replace(tmp, out)
+    print(f"\r· {n:,} entidades ({time.time() - t0:.0f}s)")
+    return n
+
+###############################################################################
+# CONSULTA                                                                   #
+###############################################################################
+
+class WikidataIndex:
+    """Consultas de solo lectura sobre el índice (una conexión por proceso)."""
+
+    def __init__(self, path: Path = INDEX_FILE):
+        self.path = Path(path)
+        self._conn = None
+        self._pid = None
+
+    def _db(self) -> sqlite3.Connection:
+        if self._pid != os.getpid():
+            uri = f"file:{self.path}?mode=ro"
+            self._conn = sqlite3.connect(uri, uri=True, check_same_thread=False)
+            self._pid = os.getpid()
+        return self._conn
+
+    def search_exact(self, label: str) -> List[str]:
+        """QIDs cuya etiqueta inglesa coincide (casefold); los alias no cuentan,
+        igual que en la búsqueda por etiqueta exacta de la API."""
+        rows = self._db().execute(
+            "SELECT qid FROM labels WHERE key = ? AND alias = 0", (label.casefold(),)
+        ).fetchall()
+        return sorted({q for (q,) in rows}, key=lambda q: int(q[1:]))
+
+    def entity(self, qid: str) -> dict | None:
+        """Entidad con la forma de `Special:EntityData` (solo `labels.en` y claims)."""
+        row = self._db().execute(
+            "SELECT label, claims FROM entities WHERE qid = ?", (qid,)
+        ).fetchone()
+        if row is None:
+            return None
+        label, claims = row
+        return {
+            "id": qid,
+            "labels": {"en": {"language": "en", "value": label}} if label else {},
+            "claims": json.loads(claims),
+        }
+
+    def p31(self, qid: str) -> set[str]:
+        ent = self.entity(qid)
+        return {
+            c["mainsnak"]["datavalue"]["value"]["id"]
+            for c in (ent or {}).get("claims", {}).get("P31", [])
+        }
+
+def open_index(path: str | Path | None = None) -> WikidataIndex | None:
+    """Índice local si existe (`path`, `$WIKIDATA_INDEX` o el de `outputs/`)."""
+    path = Path(path or os.environ.get("WIKIDATA_INDEX") or INDEX_FILE)
+    return WikidataIndex(path) if path.exists() else None
+
+###############################################################################
+# CLI                                                                        #
+###############################################################################
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Construye el índice local de Wikidata desde un dump JSON.")
+    ap.add_argument("dump", type=Path, help="dump JSON de Wikidata (.json, .json.gz o .json.bz2)")
+    ap.add_argument("--out", type=Path, default=INDEX_FILE, help="fichero SQLite de salida")
+    args = ap.parse_args()
+    print(f"📦 Indexando {args.dump} …")
+    build_index(args.dump, args.out)
+    print(f"✅  Guardado → {args.out}")